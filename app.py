@@ -4,39 +4,151 @@ KPCL Automation Application
 Main Flask application for automated form submission
 """
 
+# Green threads must be patched in before anything else imports socket/threading
+import eventlet
+eventlet.monkey_patch()
+
 from flask import Flask, render_template, request, jsonify, session
+from flask.json.provider import JSONProvider
 from flask_socketio import SocketIO, emit
-import json
+from flask_session import Session
+import redis
+import orjson
 import logging
+import logging.handlers
 import os
-from datetime import datetime, time
 import threading
+from datetime import datetime, time
+from pathlib import Path
 from automation.scheduler import AutomationScheduler
-from automation.session_manager import SessionManager
+from automation.selenium_pool import get_selenium_pool, get_session_manager
 from automation.form_filler import FormFiller
+from automation.emit_buffer import EmitBuffer
+from automation.json_store import (
+    CONFIG_DIR, SETTINGS_FILE, FORM_DATA_FILE, load_json_cached, save_json
+)
 import secrets
 
+# Working directories are created once, before logging or config use them
+LOGS_DIR = Path('logs')
+SCREENSHOTS_DIR = Path('screenshots')
+for directory in (CONFIG_DIR, LOGS_DIR, SCREENSHOTS_DIR):
+    directory.mkdir(parents=True, exist_ok=True)
+
+SECRET_KEY_FILE = CONFIG_DIR / '.secret_key'
+
+def load_secret_key():
+    """Load a stable secret key from KPCL_SECRET or the key file, creating it once"""
+    secret_key = os.environ.get('KPCL_SECRET')
+    if secret_key:
+        return secret_key
+
+    try:
+        return SECRET_KEY_FILE.read_text().strip()
+    except FileNotFoundError:
+        pass
+
+    secret_key = secrets.token_hex(32)
+    try:
+        # Created owner-only from the start, never briefly readable under the umask
+        fd = os.open(SECRET_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another process created it first; use its key
+        return SECRET_KEY_FILE.read_text().strip()
+    with os.fdopen(fd, 'w') as f:
+        f.write(secret_key)
+    return secret_key
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+            mimetype='application/json'
+        )
+
+class OrjsonSocketIOJSON:
+    """json module stand-in for python-socketio, which passes stdlib-only kwargs"""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)
-socketio = SocketIO(app, cors_allowed_origins="*")
+app.json = OrjsonProvider(app)
+app.config.update(
+    SECRET_KEY=load_secret_key(),
+    SESSION_PERMANENT=False
+)
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    json=OrjsonSocketIOJSON,
+    async_mode='eventlet',
+    ping_interval=25,
+    ping_timeout=60,
+    # Websocket frames negotiate permessage-deflate in eventlet's server;
+    # these cover the long-polling transport
+    http_compression=True,
+    compression_threshold=256
+)
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler('logs/automation.log'),
+        logging.handlers.RotatingFileHandler(LOGS_DIR / 'automation.log', maxBytes=10_000_000, backupCount=3),
         logging.StreamHandler()
     ]
 )
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+def configure_sessions(app):
+    """Keep session data server-side in Redis, falling back to SQLAlchemy"""
+    redis_url = os.environ.get('KPCL_REDIS_URL', 'redis://localhost:6379/0')
+    try:
+        client = redis.Redis.from_url(redis_url, socket_connect_timeout=1)
+        client.ping()
+        app.config.update(SESSION_TYPE='redis', SESSION_REDIS=client)
+    except redis.exceptions.RedisError as e:
+        logger.warning("Redis unavailable (%s), storing sessions in SQLite", e)
+        app.config.update(
+            SESSION_TYPE='sqlalchemy',
+            SQLALCHEMY_DATABASE_URI='sqlite:///' + str((CONFIG_DIR / 'sessions.db').resolve())
+        )
+
+    Session(app)
+
+    if app.config['SESSION_TYPE'] == 'sqlalchemy':
+        with app.app_context():
+            app.session_interface.db.create_all()
+
+configure_sessions(app)
+
 # Global instances
 scheduler = None
 session_manager = None
 form_filler = None
 
+# Set while a manual submission is running; there is only one browser to drive
+_submit_in_flight = threading.Event()
+
 # Application state
 app_state = {
     'status': 'idle',
@@ -46,46 +158,123 @@ app_state = {
     'success': False,
     'error_message': None,
     'logged_in': False,
-    'otp_required': False
+    'otp_required': False,
+    'version': 0
+}
+
+# Distinguishes this process's state versions from those of earlier runs in ETags
+_STATE_EPOCH = secrets.token_hex(4)
+
+# Guards app_state and the global manager instances; re-entrant because
+# some handlers read and then update state while holding it
+_state_lock = threading.RLock()
+
+def update_state(**changes):
+    """Apply changes to app_state and return a consistent snapshot"""
+    with _state_lock:
+        if any(app_state.get(key) != value for key, value in changes.items()):
+            app_state.update(changes)
+            app_state['version'] += 1
+        return dict(app_state)
+
+def get_state():
+    """Return a consistent snapshot of app_state"""
+    with _state_lock:
+        return dict(app_state)
+
+def get_credentials():
+    """Return the (username, password) held by the current session manager"""
+    with _state_lock:
+        if not session_manager:
+            return None, None
+        return session_manager.username, session_manager.password
+
+DEFAULT_CONFIG = {
+    'schedule_time': '07:00:01',
+    'retry_interval': 10,
+    'max_retries': 3,
+    'headless': True,
+    'browser': 'chrome',
+    'flush_interval_ms': 50,
+    'submission_budget_seconds': 60,
+    'persistent_session': False,
+    'screenshot_on_failure': False,
+    'debug_screenshots': False
+}
+
+DEFAULT_FORM_DATA = {
+    "ash_utilization": "Ash_based_Products",
+    "pickup_time": "10.00AM - 11.00AM",
+    "vehicle_type": "Bluker 16 Wheeler",
+    "quantity_limit": "36",
+    "vehicle_classification": "Hired",
+    "authorised_person": "POTHALINGAPPA C",
+    "vehicle_no": "KA28AB2222",
+    "dl_no": "7634",
+    "driver_mob_no": "9768453423"
 }
 
 def load_config():
     """Load application configuration"""
-    try:
-        with open('config/settings.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {
-            'schedule_time': '07:00:01',
-            'retry_interval': 10,
-            'max_retries': 3,
-            'headless': True,
-            'browser': 'chrome'
-        }
+    config = load_json_cached(SETTINGS_FILE)
+    return DEFAULT_CONFIG if config is None else config
 
 def save_config(config):
     """Save application configuration"""
-    os.makedirs('config', exist_ok=True)
-    with open('config/settings.json', 'w') as f:
-        json.dump(config, f, indent=2)
+    save_json(SETTINGS_FILE, config)
 
 def load_form_data():
     """Load static form data"""
-    try:
-        with open('config/form_data.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {
-            "ash_utilization": "Ash_based_Products",
-            "pickup_time": "10.00AM - 11.00AM",
-            "vehicle_type": "Bluker 16 Wheeler",
-            "quantity_limit": "36",
-            "vehicle_classification": "Hired",
-            "authorised_person": "POTHALINGAPPA C",
-            "vehicle_no": "KA28AB2222",
-            "dl_no": "7634",
-            "driver_mob_no": "9768453423"
-        }
+    form_data = load_json_cached(FORM_DATA_FILE)
+    return DEFAULT_FORM_DATA if form_data is None else form_data
+
+def save_form_data(form_data):
+    """Save static form data"""
+    save_json(FORM_DATA_FILE, form_data)
+
+selenium_pool = get_selenium_pool(load_config())
+
+# Returned when a submission holds the browser lease
+BROWSER_BUSY_MESSAGE = 'Browser is busy with a submission, please try again shortly'
+
+# Seconds /api/reset waits for the current browser holder to finish
+RESET_LEASE_WAIT = 10
+
+# Coalesce SocketIO updates so bursts of state changes go out as one frame
+emit_buffer = EmitBuffer(socketio, load_config().get('flush_interval_ms', 50))
+
+# Short wire names for status_update keys; static/js/app.js expands them
+_COMPACT_KEYS = {
+    'status': 's',
+    'last_run': 'lr',
+    'next_run': 'nr',
+    'attempts': 'a',
+    'success': 'ok',
+    'error_message': 'e',
+    'logged_in': 'li',
+    'otp_required': 'otp',
+    'version': 'v',
+    'completion': 'c'
+}
+
+def _compact(state):
+    """Rename state keys to their wire form"""
+    return {_COMPACT_KEYS.get(key, key): value for key, value in state.items()}
+
+# Last status_update payload handed to the emit buffer
+_last_emitted_state = None
+
+def emit_state(snapshot):
+    """Emit the keys of snapshot that changed since the last status_update"""
+    global _last_emitted_state
+    with _state_lock:
+        previous = _last_emitted_state or {}
+        delta = {key: value for key, value in snapshot.items()
+                 if key not in previous or previous[key] != value}
+        if not delta:
+            return
+        _last_emitted_state = snapshot
+    emit_buffer.emit('status_update', _compact(delta))
 
 @app.route('/')
 def index():
@@ -95,7 +284,7 @@ def index():
     return render_template('index.html', 
                          config=config, 
                          form_data=form_data, 
-                         app_state=app_state)
+                         app_state=get_state())
 
 @app.route('/config')
 def config_page():
@@ -107,7 +296,7 @@ def config_page():
 @app.route('/api/login', methods=['POST'])
 def api_login():
     """Handle login credentials"""
-    global session_manager, app_state
+    global session_manager
     
     try:
         data = request.get_json()
@@ -117,37 +306,42 @@ def api_login():
         if not username or not password:
             return jsonify({'success': False, 'message': 'Username and password required'})
         
-        # Store credentials in session
+        # Only the username goes in the session; the password stays with
+        # the server-side session manager
         session['username'] = username
-        session['password'] = password
         
-        # Initialize session manager
-        config = load_config()
-        session_manager = SessionManager(config)
+        # Use the pooled session manager
+        with _state_lock:
+            session_manager = selenium_pool.get()
         
-        # Attempt login
-        success, message = session_manager.login(username, password)
+        # Attempt login, unless a submission is driving the browser
+        with selenium_pool.lease(timeout=0) as held:
+            if not held:
+                return jsonify({'success': False, 'message': BROWSER_BUSY_MESSAGE}), 409
+            success, message = session_manager.login(username, password)
         
         if success:
-            app_state['logged_in'] = True
-            app_state['otp_required'] = session_manager.otp_required
-            socketio.emit('status_update', app_state)
+            snapshot = update_state(
+                logged_in=True,
+                otp_required=session_manager.otp_required
+            )
+            emit_state(snapshot)
+        else:
+            snapshot = get_state()
             
         return jsonify({
             'success': success, 
             'message': message,
-            'otp_required': app_state['otp_required']
+            'otp_required': snapshot['otp_required']
         })
         
     except Exception as e:
-        logger.error(f"Login error: {e}")
+        logger.error("Login error: %s", e)
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/verify_otp', methods=['POST'])
 def api_verify_otp():
     """Handle OTP verification"""
-    global session_manager, app_state
-    
     try:
         data = request.get_json()
         otp = data.get('otp')
@@ -158,134 +352,153 @@ def api_verify_otp():
         if not session_manager:
             return jsonify({'success': False, 'message': 'Please login first'})
         
-        success, message = session_manager.verify_otp(otp)
+        with selenium_pool.lease(timeout=0) as held:
+            if not held:
+                return jsonify({'success': False, 'message': BROWSER_BUSY_MESSAGE}), 409
+            success, message = session_manager.verify_otp(otp)
         
         if success:
-            app_state['otp_required'] = False
-            app_state['logged_in'] = True
-            socketio.emit('status_update', app_state)
+            snapshot = update_state(otp_required=False, logged_in=True)
+            emit_state(snapshot)
             
             
         return jsonify({'success': success, 'message': message})
         
     except Exception as e:
-        logger.error(f"OTP verification error: {e}")
+        logger.error("OTP verification error: %s", e)
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/start_automation', methods=['POST'])
 def api_start_automation():
     """Start the automation scheduler"""
-    global scheduler, app_state
+    global scheduler
     
     try:
-        if not session_manager or not session_manager.check_session_valid():
-            app_state['logged_in'] = False
+        with selenium_pool.lease(timeout=0) as held:
+            if held:
+                try:
+                    manager = get_session_manager()
+                except Exception:
+                    manager = None
+                logged_in = bool(manager and manager.check_session_valid())
+            else:
+                # A submission is using the browser; trust the last known login state
+                logged_in = get_state()['logged_in']
+
+        if not logged_in:
+            update_state(logged_in=False)
             return jsonify({'success': False, 'message': 'Please login first'})
 
         
         config = load_config()
         
         # Initialize scheduler
-        scheduler = AutomationScheduler(config, socketio)
+        new_scheduler = AutomationScheduler(config, emit_buffer)
+        with _state_lock:
+            scheduler = new_scheduler
         
         # Set credentials
-        scheduler.set_credentials(
-            session.get('username'),
-            session.get('password')
-        )
+        scheduler.set_credentials(*get_credentials())
         
         # Start scheduler
         success = scheduler.start()
         
         if success:
-            app_state['status'] = 'scheduled'
-            app_state['next_run'] = scheduler.get_next_run_time()
-            socketio.emit('status_update', app_state)
+            snapshot = update_state(
+                status='scheduled',
+                next_run=scheduler.get_next_run_time()
+            )
+            emit_state(snapshot)
+        else:
+            snapshot = get_state()
             
         return jsonify({
             'success': success,
             'message': 'Automation started successfully' if success else 'Failed to start automation',
-            'next_run': app_state['next_run']
+            'next_run': snapshot['next_run']
         })
         
     except Exception as e:
-        logger.error(f"Start automation error: {e}")
+        logger.error("Start automation error: %s", e)
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/stop_automation', methods=['POST'])
 def api_stop_automation():
     """Stop the automation scheduler"""
-    global scheduler, app_state
-    
     try:
-        if scheduler:
-            scheduler.stop()
+        with _state_lock:
+            current_scheduler = scheduler
+        if current_scheduler:
+            current_scheduler.stop()
             
-        app_state['status'] = 'idle'
-        app_state['next_run'] = None
-        socketio.emit('status_update', app_state)
+        snapshot = update_state(status='idle', next_run=None)
+        emit_state(snapshot)
         
         return jsonify({'success': True, 'message': 'Automation stopped'})
         
     except Exception as e:
-        logger.error(f"Stop automation error: {e}")
+        logger.error("Stop automation error: %s", e)
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/manual_submit', methods=['POST'])
 def api_manual_submit():
     """Manual form submission for testing"""
-    global form_filler, app_state
+    global form_filler
     
     try:
-        if not app_state['logged_in']:
+        if not get_state()['logged_in']:
             return jsonify({'success': False, 'message': 'Please login first'})
         
+        with _state_lock:
+            if _submit_in_flight.is_set():
+                return jsonify({'success': False, 'message': 'Submission already in progress'}), 409
+            _submit_in_flight.set()
+        
         config = load_config()
         form_data = load_form_data()
         
-        # Initialize form filler
-        form_filler = FormFiller(config, socketio)
+        # Reuse one form filler across submissions; it leases the pooled browser
+        with _state_lock:
+            if form_filler is None:
+                form_filler = FormFiller(config, emit_buffer)
+            form_filler.config = config
+            submission_filler = form_filler
         
         # Set credentials
-        form_filler.set_credentials(
-            session.get('username'),
-            session.get('password')
-        )
+        submission_filler.set_credentials(*get_credentials())
         
-        # Run in background thread
+        # Run as a background task on the event loop
         def run_submission():
             try:
-                app_state['status'] = 'running'
-                app_state['attempts'] = 1
-                socketio.emit('status_update', app_state)
-                
-                success, message = form_filler.submit_form(form_data)
+                snapshot = update_state(status='running', attempts=1)
+                emit_state(snapshot)
                 
-                app_state['status'] = 'completed'
-                app_state['success'] = success
-                app_state['error_message'] = None if success else message
-                app_state['last_run'] = datetime.now().isoformat()
+                success, message = submission_filler.submit_form(form_data)
                 
-                socketio.emit('status_update', app_state)
-                socketio.emit('submission_complete', {
-                    'success': success,
-                    'message': message
-                })
+                snapshot = update_state(
+                    status='completed',
+                    success=success,
+                    error_message=None if success else message,
+                    last_run=datetime.now().isoformat()
+                )
+                # The outcome rides along with this one update only
+                snapshot['completion'] = {'success': success, 'message': message}
+                emit_state(snapshot)
                 
             except Exception as e:
-                logger.error(f"Manual submission error: {e}")
-                app_state['status'] = 'error'
-                app_state['error_message'] = str(e)
-                socketio.emit('status_update', app_state)
+                logger.error("Manual submission error: %s", e)
+                snapshot = update_state(status='error', error_message=str(e))
+                emit_state(snapshot)
+            finally:
+                _submit_in_flight.clear()
         
-        thread = threading.Thread(target=run_submission)
-        thread.daemon = True
-        thread.start()
+        socketio.start_background_task(run_submission)
         
         return jsonify({'success': True, 'message': 'Manual submission started'})
         
     except Exception as e:
-        logger.error(f"Manual submit error: {e}")
+        _submit_in_flight.clear()
+        logger.error("Manual submit error: %s", e)
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/save_config', methods=['POST'])
@@ -296,42 +509,52 @@ def api_save_config():
         new_config = data.get('config', {})
         new_form_data = data.get('form_data', {})
         
-        # Load existing configuration
-        existing_config = load_config()
+        # Load existing configuration (copied, the loaded dict is shared)
+        existing_config = dict(load_config())
         
         # Load existing form data
-        existing_form_data = {}
-        form_data_path = 'config/form_data.json'
-        if os.path.exists(form_data_path):
-            with open(form_data_path, 'r') as f:
-                existing_form_data = json.load(f)
+        existing_form_data = dict(load_json_cached(FORM_DATA_FILE) or {})
         
         # Merge configurations (only update if new data is provided)
         if new_config:
             existing_config.update(new_config)
             save_config(existing_config)
+            # The pooled browser was built from the old settings
+            selenium_pool.update_config(existing_config)
         
         # Merge form data (only update if new data is provided)
         if new_form_data:
             existing_form_data.update(new_form_data)
-            os.makedirs('config', exist_ok=True)
-            with open(form_data_path, 'w') as f:
-                json.dump(existing_form_data, f, indent=2)
+            save_form_data(existing_form_data)
         
         return jsonify({'success': True, 'message': 'Configuration saved'})
         
     except Exception as e:
-        logger.error(f"Save config error: {e}")
+        logger.error("Save config error: %s", e)
         return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe that never touches Selenium or the session"""
+    return 'ok', 200, {'Cache-Control': 'no-store'}
+
 @app.route('/api/status')
 def api_status():
     """Get current application status"""
-    return jsonify(app_state)
+    snapshot = get_state()
+    etag = f'W/"{_STATE_EPOCH}-{snapshot["version"]}"'
+    if request.headers.get('If-None-Match') == etag:
+        return '', 304
+
+    response = jsonify(snapshot)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @socketio.on('connect')
 def handle_connect():
     """Handle WebSocket connection"""
-    emit('status_update', app_state)
+    emit('status_update', _compact(get_state()))
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -340,78 +563,128 @@ def handle_disconnect():
 
 @app.route('/api/session/status')
 def api_session_status():
-    global session_manager
+    """Report whether the pooled browser is attached and logged in"""
+    with selenium_pool.lease(timeout=0) as held:
+        if held:
+            return _session_status()
 
-    # 1️⃣ Ensure session manager exists
-    if not session_manager:
-        from automation.session_manager import SessionManager
-        config = load_config()
-        session_manager = SessionManager(config)
+    # A submission holds the browser; answer from the last known state
+    snapshot = get_state()
+    return jsonify({
+        "selenium_alive": True,
+        "logged_in": snapshot['logged_in'],
+        "automation_running": snapshot['status'] in ['running', 'scheduled'],
+        "busy": True
+    })
+
+def _session_status():
+    """Check the pooled session; the caller holds the browser lease"""
+    global session_manager
 
     selenium_alive = False
     selenium_logged_in = False
 
-    # 2️⃣ Ensure Selenium is attached to Chrome (9222)
-    if not session_manager.selenium.driver:
-        try:
-            session_manager.start_session()  # attach to :9222
-        except Exception as e:
-            return jsonify({
-                "selenium_alive": False,
-                "logged_in": False,
-                "automation_running": app_state['status'] in ['running', 'scheduled'],
-                "error": "Chrome not reachable on port 9222"
-            })
-
-    # 3️⃣ Now Selenium exists
-    selenium_alive = True
-
+    # 1️⃣ Attach to Chrome (9222) once; later polls reuse the cached manager
     try:
-        selenium_logged_in = session_manager.check_session_valid()
+        manager = get_session_manager()
     except Exception:
-        selenium_logged_in = False
+        manager = None
+
+    if manager and not manager.selenium.is_alive():
+        # The cached manager's browser died; tear it down so the next poll attaches afresh
+        logger.warning("Pooled browser is not responding, resetting it")
+        selenium_pool.reset()
+        get_session_manager.cache_clear()
+        with _state_lock:
+            session_manager = None
+        manager = None
+
+    if not manager:
+        snapshot = update_state(logged_in=False)
+        return jsonify({
+            "selenium_alive": False,
+            "logged_in": False,
+            "automation_running": snapshot['status'] in ['running', 'scheduled'],
+            "error": "Chrome not reachable on port 9222"
+        })
+
+    # 2️⃣ Now Selenium exists
+    selenium_alive = True
+    with _state_lock:
+        session_manager = manager
 
-    # 4️⃣ Sync Flask state
-    app_state['logged_in'] = selenium_logged_in
-    app_state['otp_required'] = session_manager.otp_required
+    # Ask over HTTP first so a status poll never navigates the browser
+    selenium_logged_in = manager.check_session_http()
+    if selenium_logged_in is None:
+        selenium_logged_in = manager.check_session_valid()
+
+    # 3️⃣ Sync Flask state
+    snapshot = update_state(
+        logged_in=selenium_logged_in,
+        otp_required=manager.otp_required
+    )
 
     return jsonify({
         "selenium_alive": selenium_alive,
         "logged_in": selenium_logged_in,
-        "automation_running": app_state['status'] in ['running', 'scheduled']
+        "automation_running": snapshot['status'] in ['running', 'scheduled']
     })
 
+@app.route('/api/reset', methods=['POST'])
+def api_reset():
+    """Tear down the pooled browser so the next request attaches afresh"""
+    global session_manager, form_filler
+
+    try:
+        with selenium_pool.lease(timeout=RESET_LEASE_WAIT) as held:
+            if not held:
+                return jsonify({'success': False, 'message': BROWSER_BUSY_MESSAGE}), 409
+            selenium_pool.reset()
+            get_session_manager.cache_clear()
+        with _state_lock:
+            session_manager = None
+            # The cached filler still points at the old manager
+            form_filler = None
+
+        snapshot = update_state(logged_in=False, otp_required=False)
+        emit_state(snapshot)
+        return jsonify({'success': True, 'message': 'Browser session reset'})
+
+    except Exception as e:
+        logger.error("Reset error: %s", e)
+        return jsonify({'success': False, 'message': str(e)})
+
 def restore_session_state():
-    global session_manager, app_state
+    global session_manager
 
-    config = load_config()
-    session_manager = SessionManager(config)
+    try:
+        manager = get_session_manager()
+    except Exception as e:
+        logger.info("No Selenium session to recover: %s", e)
+        return
 
-    if session_manager.selenium.driver:
-        if session_manager.check_session_valid():
-            app_state['logged_in'] = True
-            app_state['otp_required'] = False
-            logger.info("Recovered existing Selenium login session")
-        else:
-            logger.info("Selenium exists but session invalid")
+    with _state_lock:
+        session_manager = manager
+
+    with selenium_pool.lease():
+        valid = manager.check_session_valid()
+
+    if valid:
+        update_state(logged_in=True, otp_required=False)
+        logger.info("Recovered existing Selenium login session")
+    else:
+        logger.info("Selenium exists but session invalid")
 if __name__ == '__main__':
-    # Create necessary directories
-    os.makedirs('logs', exist_ok=True)
-    os.makedirs('config', exist_ok=True)
-    os.makedirs('screenshots', exist_ok=True)
-    
     # Initialize default config files
-    if not os.path.exists('config/settings.json'):
+    if not SETTINGS_FILE.exists():
         save_config(load_config())
     
-    if not os.path.exists('config/form_data.json'):
-        form_data = load_form_data()
-        with open('config/form_data.json', 'w') as f:
-            json.dump(form_data, f, indent=2)
+    if not FORM_DATA_FILE.exists():
+        save_form_data(load_form_data())
     
     logger.info("Starting KPCL Automation Application")
     restore_session_state()
     # Run the application
-    socketio.run(app, host='0.0.0.0', port=5001, debug=True, allow_unsafe_werkzeug=True)
+    socketio.run(app, host='0.0.0.0', port=5001)
 
 
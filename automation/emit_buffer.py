@@ -0,0 +1,78 @@
+"""
+Coalescing buffer for SocketIO emits
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class EmitBuffer:
+    """Batches SocketIO emits and flushes them on a short timer"""
+
+    # Events whose pending payloads merge, so the latest value of each key wins
+    COALESCED_EVENTS = ('status_update',)
+
+    # Events whose payloads are collected and sent as a single array
+    BATCHED_EVENTS = ('form_status',)
+
+    def __init__(self, socketio, flush_interval_ms=50, max_batch=32):
+        """
+        Initialize Emit Buffer
+
+        Args:
+            socketio: SocketIO instance used for the actual emits
+            flush_interval_ms (int): Delay between flushes in milliseconds
+            max_batch (int): Batched payloads that trigger an immediate flush
+        """
+        self.socketio = socketio
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending_emits = {}
+        self._lock = threading.Lock()
+        self._flush_task = None
+
+    def emit(self, event, payload):
+        """Queue an emit; unbuffered events are sent straight through"""
+        if event in self.COALESCED_EVENTS:
+            with self._lock:
+                self._pending_emits.setdefault(event, {}).update(payload)
+        elif event in self.BATCHED_EVENTS:
+            with self._lock:
+                batch = self._pending_emits.setdefault(event, [])
+                batch.append(payload)
+                full = len(batch) >= self.max_batch
+            if full:
+                self.flush()
+        else:
+            self.socketio.emit(event, payload)
+            return
+
+        self._ensure_flush_task()
+
+    def flush(self):
+        """Send every pending payload with one emit per event name"""
+        with self._lock:
+            if not self._pending_emits:
+                return
+            pending = self._pending_emits
+            self._pending_emits = {}
+
+        for event, payload in pending.items():
+            try:
+                self.socketio.emit(event, payload)
+            except Exception as e:
+                logger.error("Failed to emit %s: %s", event, e)
+
+    def _ensure_flush_task(self):
+        """Start the flush loop on first use"""
+        if self._flush_task is None:
+            with self._lock:
+                if self._flush_task is None:
+                    self._flush_task = self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        """Background loop draining the pending emits"""
+        while True:
+            self.socketio.sleep(self.flush_interval)
+            self.flush()
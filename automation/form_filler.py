@@ -3,19 +3,63 @@ Form Filler for automated KPCL gatepass form submission
 """
 
 import logging
+import random
+import re
 import time
 import json
 from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.select import Select
-from automation.selenium_handler import SeleniumHandler
-from automation.session_manager import SessionManager
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from automation.selenium_pool import get_selenium_pool, get_session_manager
 
 logger = logging.getLogger(__name__)
 
+# Fill plan for the gatepass form: (form_data key, DOM field name, kind)
+_FORM_PLAN = (
+    ('ash_utilization', 'ash_utilization', 'select'),
+    ('pickup_time', 'pickup_time', 'select'),
+    ('vehicle_no', 'vehicle_no1', 'text'),
+    ('dl_no', 'dl_no', 'text'),
+    ('driver_mob_no', 'driver_mob_no1', 'text'),
+    ('authorised_person', 'authorised_person', 'select'),
+)
+
+# Fields the page fills in itself and that are read back before submitting
+_DYN_FIELDS = (
+    'ash_price', 'balance_amount', 'gatepass_token',
+    'total_extra', 'full_flyash', 'extra_flyash',
+)
+
+def _backoff(attempt):
+    """Capped exponential delay with jitter so retries spread out under contention"""
+    return min(2 ** attempt, 8) + random.uniform(0, 1.5)
+
+def _by_name(name):
+    """CSS selector for a form field by its name attribute"""
+    return f'[name="{name}"]'
+
 class FormFiller:
     """Handles automated form filling and submission"""
     
+    # Submission result indicators; the same patterns drive the in-page check
+    _SUCCESS_PATTERN = r'success|generated|submitted|complete'
+    _ERROR_PATTERN = r'invalid session|exhausted|failed|error|expired'
+    _SUCCESS_RE = re.compile(_SUCCESS_PATTERN, re.IGNORECASE)
+    _ERROR_RE = re.compile(_ERROR_PATTERN, re.IGNORECASE)
+    
+    # Containers the portal reports results in; the rest of the page (form
+    # labels, inline scripts) mentions these words too
+    _STATUS_SELECTOR = '.alert, .toast, .msg, #status, .error'
+    
+    # True once a status container reports either outcome
+    _STATUS_REPORTED_SCRIPT = """
+        const pattern = new RegExp(arguments[1] + '|' + arguments[2], 'i');
+        return [...document.querySelectorAll(arguments[0])].some(e => pattern.test(e.innerText));
+    """
+    
     def __init__(self, config, socketio=None):
         """
         Initialize Form Filler
@@ -26,22 +70,11 @@ class FormFiller:
         """
         self.config = config
         self.socketio = socketio
-        self.session_manager = SessionManager(config)
+        self.session_manager = get_selenium_pool(config).get()
+        # Set once a login check passes; later attempts can trust it
+        self._session_verified = False
         self.username = None
         self.password = None
-        
-        # Form field mappings
-        self.field_mappings = {
-            'ash_utilization': 'ash_utilization',
-            'pickup_time': 'pickup_time',
-            'vehicle_type': 'vehicle_type',
-            'quantity_limit': 'quantity_limit',
-            'vehicle_classification': 'vehicle_classification',
-            'authorised_person': 'authorised_person',
-            'vehicle_no': 'vehicle_no1',
-            'dl_no': 'dl_no',
-            'driver_mob_no': 'driver_mob_no1'
-        }
     
     def set_credentials(self, username, password):
         """Set login credentials"""
@@ -59,32 +92,58 @@ class FormFiller:
             }
             self.socketio.emit('form_status', update)
     
-    def submit_form(self, form_data, max_retries=3):
+    def submit_form(self, form_data, max_retries=3, attempt=1):
         """
         Submit the gatepass form with retry mechanism
         
         Args:
             form_data (dict): Form data to submit
             max_retries (int): Maximum number of retries
+            attempt (int): Caller's attempt number; later attempts reuse a verified session
             
         Returns:
             tuple: (success, message)
         """
+        budget = self.config.get('submission_budget_seconds', 60)
+        
+        pool = get_selenium_pool(self.config)
+        
+        # Hold the browser for the whole submission so nothing navigates it mid-form
+        with pool.lease(timeout=budget) as held:
+            if not held:
+                logger.warning("Browser stayed busy for %ss, submission skipped", budget)
+                return False, "Browser is busy with another operation"
+            self._use_pooled_session(pool)
+            return self._submit_form(form_data, max_retries, attempt, budget)
+    
+    def _use_pooled_session(self, pool):
+        """Pick up the pool's current session manager; it is replaced on reset"""
+        session_manager = pool.get()
+        if session_manager is not self.session_manager:
+            self.session_manager = session_manager
+            self._session_verified = False
+    
+    def _submit_form(self, form_data, max_retries, attempt, budget):
+        """Submission retry loop; the caller holds the browser lease"""
         retry_count = 0
+        started = time.monotonic()
         
         while retry_count < max_retries:
             try:
                 retry_count += 1
-                logger.info(f"Form submission attempt {retry_count}/{max_retries}")
+                logger.info("Form submission attempt %s/%s", retry_count, max_retries)
+                
+                # Every attempt after the caller's first may follow a browser crash
+                if attempt + retry_count > 2:
+                    self._recover_dead_browser()
                 
                 self.emit_status('starting', f'Starting submission attempt {retry_count}')
                 
                 # Ensure session is valid
-                success, message = self._ensure_valid_session()
+                success, message = self._ensure_valid_session(reuse=attempt + retry_count > 2)
                 if not success:
-                    if retry_count < max_retries:
-                        logger.warning(f"Session setup failed, retrying in 10 seconds: {message}")
-                        time.sleep(10)
+                    if retry_count < max_retries and self._wait_before_retry(retry_count, started, budget):
+                        logger.warning("Session setup failed, retrying: %s", message)
                         continue
                     else:
                         return False, f"Session setup failed: {message}"
@@ -92,9 +151,9 @@ class FormFiller:
                 # Navigate to gatepass page
                 self.emit_status('navigating', 'Navigating to gatepass page')
                 if not self.session_manager.navigate_to_gatepass():
-                    if retry_count < max_retries:
+                    self._session_verified = False
+                    if retry_count < max_retries and self._wait_before_retry(retry_count, started, budget):
                         logger.warning("Failed to navigate to gatepass page, retrying")
-                        time.sleep(10)
                         continue
                     else:
                         return False, "Failed to navigate to gatepass page"
@@ -115,10 +174,9 @@ class FormFiller:
                     logger.info("Form submission successful")
                     return True, "Form submitted successfully"
                 else:
-                    if retry_count < max_retries:
-                        logger.warning(f"Form submission failed, retrying in 10 seconds: {message}")
+                    if retry_count < max_retries and self._wait_before_retry(retry_count, started, budget):
+                        logger.warning("Form submission failed, retrying: %s", message)
                         self.emit_status('retrying', f'Retry {retry_count}: {message}')
-                        time.sleep(10)
                     else:
                         self.emit_status('failed', f'All retries failed: {message}')
                         return False, f"Form submission failed after {max_retries} attempts: {message}"
@@ -126,18 +184,70 @@ class FormFiller:
             except Exception as e:
                 error_msg = f"Error in submission attempt {retry_count}: {str(e)}"
                 logger.error(error_msg)
+                self._session_verified = False
                 
-                if retry_count < max_retries:
+                if retry_count < max_retries and self._wait_before_retry(retry_count, started, budget):
                     self.emit_status('error', f'Error, retrying: {str(e)}')
-                    time.sleep(10)
                 else:
                     self.emit_status('failed', f'Fatal error: {str(e)}')
                     return False, error_msg
         
         return False, "Maximum retries exceeded"
     
-    def _ensure_valid_session(self):
-        """Ensure we have a valid logged-in session"""
+    def _recover_dead_browser(self):
+        """
+        Replace the pooled browser if it stopped responding
+        
+        Returns:
+            bool: True if the pool was reset
+        """
+        selenium = self.session_manager.selenium
+        if not selenium.driver or selenium.is_alive():
+            return False
+        
+        logger.warning("Browser session died, resetting the pool")
+        pool = get_selenium_pool(self.config)
+        pool.reset()
+        get_session_manager.cache_clear()
+        self.session_manager = pool.get()
+        self._session_verified = False
+        return True
+    
+    def _wait_before_retry(self, retry_count, started, budget):
+        """
+        Back off before the next attempt unless the submission window is spent
+        
+        Args:
+            retry_count (int): Attempts made so far
+            started (float): Monotonic time the submission began
+            budget (float): Seconds the whole submission may take
+            
+        Returns:
+            bool: True if another attempt should be made
+        """
+        delay = _backoff(retry_count)
+        if time.monotonic() - started + delay > budget:
+            logger.warning("Submission window of %ss exhausted, not retrying", budget)
+            return False
+        
+        # time.sleep is green under eventlet, so this does not stall the socket loop
+        time.sleep(delay)
+        return True
+    
+    def _ensure_valid_session(self, reuse=False):
+        """
+        Ensure we have a valid logged-in session
+        
+        Args:
+            reuse (bool): Skip the login check if an earlier attempt verified the session
+            
+        Returns:
+            tuple: (success, message)
+        """
+        if reuse and self._session_verified and self.session_manager.selenium.driver:
+            return True, "Reusing verified session"
+        
+        self._session_verified = False
         try:
             # Start session if not already started
             if not self.session_manager.selenium.driver:
@@ -157,132 +267,120 @@ class FormFiller:
                 if self.session_manager.otp_required:
                     return False, "OTP required for login. Please complete login manually."
             
+            self._session_verified = True
             return True, "Session is valid"
             
         except Exception as e:
-            logger.error(f"Session validation error: {e}")
+            logger.error("Session validation error: %s", e)
             return False, f"Session validation error: {str(e)}"
     
     def _extract_dynamic_data(self):
-        """Extract dynamic data from the gatepass page"""
+        """Extract dynamic data from the gatepass page in one round-trip"""
+        values = self.session_manager.selenium.batch_read(
+            [_by_name(field) for field in _DYN_FIELDS]
+        )
+        
+        # Drop empty optional values, fall back to defaults for the required ones
         dynamic_data = {}
+        for field in _DYN_FIELDS:
+            value = values.get(_by_name(field))
+            if value:
+                dynamic_data[field] = value
+        dynamic_data.setdefault('ash_price', '150')
+        dynamic_data.setdefault('balance_amount', '0')
         
+        logger.info("Extracted ash price: %s", dynamic_data['ash_price'])
+        logger.info("Extracted balance amount: %s", dynamic_data['balance_amount'])
+        if dynamic_data.get('gatepass_token'):
+            logger.info("Extracted gatepass token: %s...", dynamic_data['gatepass_token'][:20])
+        
+        return dynamic_data
+    
+    def _install_alert_hook(self, selenium):
+        """Replace window.alert/confirm with a queue that can be drained cheaply"""
         try:
-            # Extract current ash price
-            ash_price_element = self.session_manager.selenium.find_element(By.NAME, "ash_price")
-            if ash_price_element:
-                ash_price = ash_price_element.get_attribute("value") or "150"
-                dynamic_data['ash_price'] = ash_price
-                logger.info(f"Extracted ash price: {ash_price}")
-            
-            # Extract balance amount
-            balance_element = self.session_manager.selenium.find_element(By.NAME, "balance_amount")
-            if balance_element:
-                balance = balance_element.get_attribute("value") or "0"
-                dynamic_data['balance_amount'] = balance
-                logger.info(f"Extracted balance amount: {balance}")
-            
-            # Extract gatepass token
-            token_element = self.session_manager.selenium.find_element(By.NAME, "gatepass_token")
-            if token_element:
-                token = token_element.get_attribute("value")
-                dynamic_data['gatepass_token'] = token
-                logger.info(f"Extracted gatepass token: {token[:20]}...")
-            
-            # Extract other dynamic fields that might be present
-            dynamic_fields = [
-                'total_extra', 'full_flyash', 'extra_flyash'
-            ]
-            
-            for field in dynamic_fields:
-                element = self.session_manager.selenium.find_element(By.NAME, field)
-                if element:
-                    value = element.get_attribute("value")
-                    if value:
-                        dynamic_data[field] = value
-                        logger.debug(f"Extracted {field}: {value}")
-            
+            selenium.driver.execute_script("""
+                window.__alertQ = [];
+                window.alert = (m) => { window.__alertQ.push(['alert', String(m)]); };
+                window.confirm = (m) => { window.__alertQ.push(['confirm', String(m)]); return true; };
+            """)
         except Exception as e:
-            logger.warning(f"Error extracting dynamic data: {e}")
+            logger.warning("Failed to install alert hook: %s", e)
+    
+    def _drain_alert_queue(self, selenium):
+        """
+        Collect and clear alerts captured by the in-page hook
         
-        return dynamic_data
+        Returns:
+            list: Alert messages in the order they were raised
+        """
+        try:
+            queued = selenium.driver.execute_script(
+                "const q = window.__alertQ || []; window.__alertQ = []; return q;"
+            ) or []
+        except Exception as e:
+            logger.debug("Alert queue unavailable: %s", e)
+            return []
+        
+        messages = []
+        for kind, message in queued:
+            logger.info("Page %s handled: %s", kind, message)
+            messages.append(message)
+        return messages
     
     def _fill_and_submit_form(self, form_data):
         """Fill and submit the form with robust element handling"""
         try:
             selenium = self.session_manager.selenium
             
-            # Handle any initial alerts
-            selenium.handle_possible_alerts(timeout=10)
-            
-            # Fill ash utilization dropdown
-            if 'ash_utilization' in form_data:
-                ash_dropdown = selenium.wait_for_element_robust(By.NAME, 'ash_utilization', timeout=30)
-                if ash_dropdown:
-                    try:
-                        select = Select(ash_dropdown)
-                        select.select_by_visible_text(form_data['ash_utilization'])
-                        logger.info(f"Selected ash utilization: {form_data['ash_utilization']}")
-                        selenium.handle_possible_alerts(timeout=5)
-                    except Exception as e:
-                        logger.warning(f"Failed to select ash utilization: {e}")
-                else:
-                    logger.warning("Ash utilization dropdown not found")
-            
-            # Fill pickup time dropdown
-            if 'pickup_time' in form_data:
-                pickup_dropdown = selenium.wait_for_element_robust(By.NAME, 'pickup_time', timeout=30)
-                if pickup_dropdown:
-                    try:
-                        select = Select(pickup_dropdown)
-                        select.select_by_visible_text(form_data['pickup_time'])
-                        logger.info(f"Selected pickup time: {form_data['pickup_time']}")
-                        selenium.handle_possible_alerts(timeout=5)
-                    except Exception as e:
-                        logger.warning(f"Failed to select pickup time: {e}")
-                else:
-                    logger.warning("Pickup time dropdown not found")
+            # Capture page alerts in-page instead of polling for them after every field
+            self._install_alert_hook(selenium)
             
-            # Fill vehicle information
-            vehicle_fields = [
-                ('vehicle_no', 'vehicle_no1'),
-                ('dl_no', 'dl_no'),
-                ('driver_mob_no', 'driver_mob_no1')
+            # Write every field in one round-trip, dropdowns matched by visible text
+            fill_names = [
+                field_name for form_key, field_name, _ in _FORM_PLAN if form_key in form_data
             ]
+            filled = selenium.batch_fill([
+                (_by_name(field_name), form_data[form_key])
+                for form_key, field_name, _ in _FORM_PLAN if form_key in form_data
+            ])
+            fill_results = dict(zip(fill_names, filled))
+            
+            self._drain_alert_queue(selenium)
             
-            for form_key, field_name in vehicle_fields:
-                if form_key in form_data:
-                    field_element = selenium.wait_for_element_robust(By.NAME, field_name, timeout=30)
-                    if field_element:
+            for form_key, field_name, kind in _FORM_PLAN:
+                if form_key not in form_data:
+                    continue
+                if fill_results.get(field_name):
+                    logger.info("Filled %s: %s", field_name, form_data[form_key])
+                elif kind == 'select':
+                    # Options may still be loading; fall back to a waited Select
+                    dropdown = selenium.wait_for_element_robust(By.NAME, field_name, timeout=30)
+                    if dropdown:
                         try:
-                            field_element.clear()
-                            field_element.send_keys(form_data[form_key])
-                            logger.info(f"Filled {field_name}: {form_data[form_key]}")
-                            selenium.handle_possible_alerts(timeout=5)
+                            Select(dropdown).select_by_visible_text(form_data[form_key])
+                            logger.info("Selected %s: %s", field_name, form_data[form_key])
+                            self._drain_alert_queue(selenium)
                         except Exception as e:
-                            logger.warning(f"Failed to fill {field_name}: {e}")
+                            logger.warning("Failed to select %s: %s", field_name, e)
                     else:
-                        logger.warning(f"Field {field_name} not found")
-            
-            # Select authorised person dropdown
-            if 'authorised_person' in form_data:
-                auth_dropdown = selenium.wait_for_element_robust(By.NAME, 'authorised_person', timeout=30)
-                if auth_dropdown:
-                    try:
-                        select = Select(auth_dropdown)
-                        select.select_by_visible_text(form_data['authorised_person'])
-                        logger.info(f"Selected authorised person: {form_data['authorised_person']}")
-                        selenium.handle_possible_alerts(timeout=5)
-                    except Exception as e:
-                        logger.warning(f"Failed to select authorised person: {e}")
+                        logger.warning("Dropdown %s not found", field_name)
                 else:
-                    logger.warning("Authorised person dropdown not found")
+                    logger.warning("Field %s not found", field_name)
             
-            # Wait for form to update
-            time.sleep(3)
+            # Wait until the page has enabled the submit button
+            try:
+                WebDriverWait(selenium.driver, 10).until(
+                    lambda d: d.execute_script(
+                        "return document.getElementsByName('generate_flyash_gatepass')[0]?.disabled === false"
+                    )
+                )
+            except TimeoutException:
+                logger.warning("Submit button not enabled after filling form")
             
-            # Handle any alerts before submission
-            selenium.handle_possible_alerts(timeout=10)
+            # Clear any alerts before submission
+            selenium.handle_alert(accept=True, timeout=0)
+            self._drain_alert_queue(selenium)
             
             # Submit the form
             logger.info("Submitting the form")
@@ -291,60 +389,70 @@ class FormFiller:
             if submit_button:
                 # Scroll to submit button
                 selenium.driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-                time.sleep(1)
+                try:
+                    WebDriverWait(selenium.driver, 2).until(
+                        EC.element_to_be_clickable((By.NAME, "generate_flyash_gatepass"))
+                    )
+                except TimeoutException:
+                    logger.warning("Submit button not clickable after scrolling")
                 
                 # Take screenshot before submission
-                selenium.take_screenshot("before_submission.png")
+                selenium.debug_screenshot("before_submission.png")
                 
                 # Click submit button
                 logger.info("Clicking submit button")
+                url_before_submit = selenium.get_current_url()
                 submit_button.click()
                 
-                # Handle alerts immediately after submission
-                selenium.handle_possible_alerts(timeout=15)
+                # Wait for whatever the portal does first: an alert, a redirect
+                # or a result message
+                try:
+                    WebDriverWait(selenium.driver, 15).until(EC.any_of(
+                        EC.alert_is_present(),
+                        lambda d: d.execute_script("return (window.__alertQ || []).length > 0"),
+                        EC.url_changes(url_before_submit),
+                        lambda d: d.execute_script(
+                            self._STATUS_REPORTED_SCRIPT,
+                            self._STATUS_SELECTOR, self._SUCCESS_PATTERN, self._ERROR_PATTERN
+                        )
+                    ))
+                except TimeoutException:
+                    logger.warning("No response detected after submission")
                 
-                # Wait for response
-                time.sleep(5)
+                # The portal often reports the result in an alert
+                alert_texts = [selenium.handle_alert(accept=True, timeout=0)]
+                alert_texts.extend(self._drain_alert_queue(selenium))
+                alert_text = ' '.join(text for text in alert_texts if text)
+                if alert_text:
+                    if self._ERROR_RE.search(alert_text):
+                        logger.warning("Error alert after submission: %s", alert_text)
+                        return False, f"Form submission failed: {alert_text}"
+                    if self._SUCCESS_RE.search(alert_text):
+                        logger.info("Success alert after submission: %s", alert_text)
+                        return True, "Form submitted successfully"
                 
                 # Take screenshot after submission
-                selenium.take_screenshot("after_submission.png")
+                selenium.debug_screenshot("after_submission.png")
                 
                 # Check current URL for success/error indicators
                 current_url = selenium.get_current_url()
-                logger.info(f"Current URL after submission: {current_url}")
+                logger.info("Current URL after submission: %s", current_url)
                 
-                # Check for success/error messages on page
-                success_found = False
-                error_found = False
+                # Classify the result from the page's status containers only;
+                # the whole body also holds the form text and gives false positives
+                verdict = selenium.driver.execute_script("""
+                    const texts = [...document.querySelectorAll(arguments[2])]
+                        .map(e => e.innerText).join(' ');
+                    if (new RegExp(arguments[1], 'i').test(texts)) return 'error';
+                    if (new RegExp(arguments[0], 'i').test(texts)) return 'success';
+                    return 'unknown';
+                """, self._SUCCESS_PATTERN, self._ERROR_PATTERN, self._STATUS_SELECTOR)
                 
-                # Look for success indicators in page content
-                page_body = selenium.wait_for_element_robust(By.TAG_NAME, "body", timeout=10)
-                if page_body:
-                    page_text = page_body.text.lower()
-                    
-                    success_indicators = [
-                        "success", "generated", "gatepass", "complete", "submitted"
-                    ]
-                    
-                    error_indicators = [
-                        "invalid session", "exhausted", "failed", "error", "expired"
-                    ]
-                    
-                    for indicator in success_indicators:
-                        if indicator in page_text:
-                            success_found = True
-                            logger.info(f"Success indicator found: {indicator}")
-                            break
-                    
-                    for indicator in error_indicators:
-                        if indicator in page_text:
-                            error_found = True
-                            logger.warning(f"Error indicator found: {indicator}")
-                            break
-                
-                if success_found:
+                if verdict == 'success':
+                    logger.info("Success indicator found")
                     return True, "Form submitted successfully"
-                elif error_found:
+                elif verdict == 'error':
+                    logger.warning("Error indicator found")
                     return False, "Form submission failed - check page for details"
                 else:
                     # If no clear indicators, assume success if no obvious errors
@@ -354,7 +462,7 @@ class FormFiller:
                 return False, "Submit button not found"
             
         except Exception as e:
-            logger.error(f"Form submission error: {e}")
+            logger.error("Form submission error: %s", e)
             try:
                 self.session_manager.selenium.take_screenshot("form_submission_error.png")
             except:
@@ -362,15 +470,20 @@ class FormFiller:
             return False, f"Form submission error: {str(e)}"
     
     def cleanup(self):
-        """Cleanup resources"""
-        try:
-            if self.session_manager:
-                self.session_manager.stop_session()
-        except Exception as e:
-            logger.error(f"Cleanup error: {e}")
+        """Cleanup resources; the pooled browser session stays attached for reuse"""
+        logger.debug("Form filler finished, browser session kept in pool")
     
     def test_form_access(self):
         """Test if we can access the gatepass form"""
+        pool = get_selenium_pool(self.config)
+        with pool.lease(timeout=0) as held:
+            if not held:
+                return False, "Browser is busy with another operation"
+            self._use_pooled_session(pool)
+            return self._test_form_access()
+    
+    def _test_form_access(self):
+        """Check the gatepass form is reachable; the caller holds the browser lease"""
         try:
             # Ensure session is valid
             success, message = self._ensure_valid_session()
@@ -392,5 +505,5 @@ class FormFiller:
                 return False, "Gatepass form not found on page"
             
         except Exception as e:
-            logger.error(f"Form access test error: {e}")
+            logger.error("Form access test error: %s", e)
             return False, f"Form access test error: {str(e)}"
@@ -0,0 +1,52 @@
+"""
+Cached access to the JSON files under config/
+"""
+
+import os
+from pathlib import Path
+import orjson
+
+CONFIG_DIR = Path('config')
+SETTINGS_FILE = CONFIG_DIR / 'settings.json'
+FORM_DATA_FILE = CONFIG_DIR / 'form_data.json'
+
+# Parsed JSON files keyed by path, stored as (mtime_ns, data)
+_json_cache = {}
+
+def load_json_cached(path):
+    """
+    Load a JSON file, reparsing only when its mtime changes
+
+    The returned object is shared between callers; copy it before changing it.
+
+    Args:
+        path (Path): File to load
+
+    Returns:
+        The parsed data, or None if the file does not exist
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _json_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = (mtime, orjson.loads(f.read()))
+        _json_cache[path] = cached
+    return cached[1]
+
+def save_json(path, data):
+    """
+    Atomically write a JSON file and drop its cached copy
+
+    Args:
+        path (Path): File to write
+        data: JSON-serializable data
+    """
+    # Write-then-rename so the cached loader never parses a half-written file
+    tmp_path = path.with_suffix('.json.tmp')
+    tmp_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    tmp_path.replace(path)
+    _json_cache.pop(path, None)
@@ -1,21 +1,117 @@
+import atexit
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+from datetime import date, datetime
+from pathlib import Path
 
-# Create logs directory if it doesn't exist
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
+# Application logger, looked up once rather than on every helper call
+_LOGGER = logging.getLogger('kpcl_automation')
+
+# Directory for the per-day log files; created by setup_logger
+log_dir = Path("logs")
+
+# Bytes read from the end of the log when building the dashboard summary
+LOG_TAIL_BYTES = 16384
+
+# Today's log filename, recomputed when the date changes
+_cached_date = None
+_cached_log_filename = None
+
+def _todays_log_filename():
+    """Return the per-day log filename, formatting it once per day"""
+    global _cached_date, _cached_log_filename
+    
+    today = date.today()
+    if _cached_date != today:
+        _cached_log_filename = log_dir / f"automation_{today.strftime('%Y%m%d')}.log"
+        _cached_date = today
+    return _cached_log_filename
+
+# Background listener that owns the real handlers; started by setup_logger
+_listener = None
+
+class BufferedFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that batches writes in a 64KB buffer and flushes on a timer"""
+    
+    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding='utf-8',
+                 delay=False, buffer_size=65536, flush_interval=1.0):
+        """
+        Initialize Buffered File Handler
+        
+        Args:
+            filename (str): Log file path
+            mode (str): Text-style open mode; the file is opened in binary
+            maxBytes (int): Size at which the file is rotated; 0 never rotates
+            backupCount (int): Rotated files to keep
+            encoding (str): Encoding applied to formatted records
+            delay (bool): Defer opening the file until the first record
+            buffer_size (int): Write buffer size in bytes
+            flush_interval (float): Seconds between background flushes
+        """
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._stopped = threading.Event()
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
+        
+        flusher = threading.Thread(target=self._flush_loop, name='log-flusher', daemon=True)
+        flusher.start()
+    
+    def _open(self):
+        """Open the log file as a buffered binary stream"""
+        return open(self.baseFilename, self.mode.replace('b', '') + 'b', buffering=self.buffer_size)
+    
+    def emit(self, record):
+        """Write the record into the buffer without flushing it"""
+        try:
+            msg = (self.format(record) + self.terminator).encode(self.encoding or 'utf-8')
+            with self.lock:
+                if self.stream is None:
+                    self.stream = self._open()
+                # tell() counts buffered bytes, so this check never forces a flush
+                if self.maxBytes > 0 and self.stream.tell() + len(msg) >= self.maxBytes:
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.write(msg)
+        except Exception:
+            self.handleError(record)
+    
+    def _flush_loop(self):
+        """Push buffered records to disk until the handler is closed"""
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+    
+    def close(self):
+        """Stop the flush loop, then flush and close the file"""
+        self._stopped.set()
+        super().close()
+
+def _stop_listener():
+    """Drain queued records, stop the listener thread and close its handlers"""
+    global _listener
+    
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(_stop_listener)
 
 def setup_logger():
     """Setup application logger with file and console handlers"""
+    global _listener
     
     # Create logger
-    logger = logging.getLogger('kpcl_automation')
+    logger = _LOGGER
     logger.setLevel(logging.DEBUG)
     
     # Clear existing handlers
     logger.handlers.clear()
+    _stop_listener()
     
     # Create formatters
     detailed_formatter = logging.Formatter(
@@ -26,8 +122,11 @@ def setup_logger():
     )
     
     # File handler for detailed logs
-    log_filename = f"logs/automation_{datetime.now().strftime('%Y%m%d')}.log"
-    file_handler = logging.FileHandler(log_filename)
+    os.makedirs(log_dir, exist_ok=True)
+    log_filename = _todays_log_filename()
+    file_handler = BufferedFileHandler(
+        log_filename, maxBytes=32 * 1024 * 1024, backupCount=5, delay=True
+    )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(detailed_formatter)
     
@@ -36,123 +135,122 @@ def setup_logger():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(simple_formatter)
     
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Callers only enqueue records; a listener thread does the actual I/O
+    log_queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
     
     return logger
 
-def log_session_activity(activity, details=None, level='info'):
-    """Log session-related activities with context"""
-    logger = logging.getLogger('kpcl_automation')
+# Log levels accepted by the log_*_activity helpers
+LEVEL_MAP = {
+    'error': logging.ERROR,
+    'warning': logging.WARNING,
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+}
+
+# Log levels for automation step statuses; anything else logs at INFO
+STEP_LEVEL_MAP = {
+    'SUCCESS': logging.INFO,
+    'COMPLETED': logging.INFO,
+    'FAILED': logging.ERROR,
+    'ERROR': logging.ERROR,
+    'WARNING': logging.WARNING,
+    'RETRY': logging.WARNING,
+}
+
+def _log_activity(fmt, fmt_details, activity, details, level):
+    """Log an activity with a constant format, skipping all work when the level is disabled"""
+    logger = _LOGGER
+    log_level = LEVEL_MAP.get(level.lower(), logging.INFO)
+    
+    if not logger.isEnabledFor(log_level):
+        return
     
-    message = f"SESSION: {activity}"
+    # Attribute funcName/lineno to whoever called the log_*_activity helper
     if details:
-        message += f" - {details}"
-    
-    if level.lower() == 'error':
-        logger.error(message)
-    elif level.lower() == 'warning':
-        logger.warning(message)
-    elif level.lower() == 'debug':
-        logger.debug(message)
+        logger.log(log_level, fmt_details, activity, details, stacklevel=3)
     else:
-        logger.info(message)
+        logger.log(log_level, fmt, activity, stacklevel=3)
+
+def log_session_activity(activity, details=None, level='info'):
+    """Log session-related activities with context"""
+    _log_activity("SESSION: %s", "SESSION: %s - %s", activity, details, level)
 
 def log_form_activity(activity, details=None, level='info'):
     """Log form submission activities with context"""
-    logger = logging.getLogger('kpcl_automation')
-    
-    message = f"FORM: {activity}"
-    if details:
-        message += f" - {details}"
-    
-    if level.lower() == 'error':
-        logger.error(message)
-    elif level.lower() == 'warning':
-        logger.warning(message)
-    elif level.lower() == 'debug':
-        logger.debug(message)
-    else:
-        logger.info(message)
+    _log_activity("FORM: %s", "FORM: %s - %s", activity, details, level)
 
 def log_scheduler_activity(activity, details=None, level='info'):
     """Log scheduler activities with context"""
-    logger = logging.getLogger('kpcl_automation')
-    
-    message = f"SCHEDULER: {activity}"
-    if details:
-        message += f" - {details}"
-    
-    if level.lower() == 'error':
-        logger.error(message)
-    elif level.lower() == 'warning':
-        logger.warning(message)
-    elif level.lower() == 'debug':
-        logger.debug(message)
-    else:
-        logger.info(message)
+    _log_activity("SCHEDULER: %s", "SCHEDULER: %s - %s", activity, details, level)
 
 def log_automation_step(step, status, details=None):
     """Log automation execution steps with standardized format"""
-    logger = logging.getLogger('kpcl_automation')
+    logger = _LOGGER
+    log_level = STEP_LEVEL_MAP.get(status.upper(), logging.INFO)
     
-    timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
-    message = f"AUTOMATION [{timestamp}] Step: {step} | Status: {status}"
+    if not logger.isEnabledFor(log_level):
+        return
     
+    timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
     if details:
-        message += f" | Details: {details}"
-    
-    if status.upper() in ['SUCCESS', 'COMPLETED']:
-        logger.info(message)
-    elif status.upper() in ['FAILED', 'ERROR']:
-        logger.error(message)
-    elif status.upper() in ['WARNING', 'RETRY']:
-        logger.warning(message)
+        logger.log(log_level, "AUTOMATION [%s] Step: %s | Status: %s | Details: %s",
+                   timestamp, step, status, details)
     else:
-        logger.info(message)
+        logger.log(log_level, "AUTOMATION [%s] Step: %s | Status: %s", timestamp, step, status)
 
 def log_debug_info(component, info):
     """Log debug information for troubleshooting"""
-    logger = logging.getLogger('kpcl_automation')
-    logger.debug(f"DEBUG [{component}]: {info}")
+    logger = _LOGGER
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("DEBUG [%s]: %s", component, info)
 
 def log_performance_metric(operation, duration, details=None):
     """Log performance metrics for optimization"""
-    logger = logging.getLogger('kpcl_automation')
+    logger = _LOGGER
     
-    message = f"PERFORMANCE: {operation} took {duration:.2f}s"
     if details:
-        message += f" - {details}"
-    
-    logger.info(message)
+        logger.info("PERFORMANCE: %s took %.2fs - %s", operation, duration, details)
+    else:
+        logger.info("PERFORMANCE: %s took %.2fs", operation, duration)
 
 def get_log_summary():
     """Get recent log entries for dashboard display"""
     try:
-        log_filename = f"logs/automation_{datetime.now().strftime('%Y%m%d')}.log"
+        log_filename = _todays_log_filename()
         
         if not os.path.exists(log_filename):
             return []
         
-        with open(log_filename, 'r') as f:
-            lines = f.readlines()
+        # Only the tail of the file is needed for the last 50 lines
+        with open(log_filename, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - LOG_TAIL_BYTES)
+            f.seek(start)
+            tail = f.read()
         
-        # Return last 50 lines
-        recent_lines = lines[-50:] if len(lines) > 50 else lines
+        lines = tail.splitlines()
+        if start > 0:
+            # Drop the partial line the seek landed in
+            lines = lines[1:]
         
-        # Clean and format lines
+        # Clean and format the last 50 lines
         cleaned_lines = []
-        for line in recent_lines:
-            line = line.strip()
+        for line in lines[-50:]:
+            line = line.decode('utf-8', errors='replace').strip()
             if line:
                 cleaned_lines.append(line)
         
         return cleaned_lines
         
     except Exception as e:
-        logger = logging.getLogger('kpcl_automation')
-        logger.error(f"Error reading log summary: {str(e)}")
+        logger = _LOGGER
+        logger.error("Error reading log summary: %s", e)
         return []
 
 # Initialize logger when module is imported
@@ -4,15 +4,25 @@ Scheduler for automated form submission at specific times
 
 import logging
 import threading
-import time
-from datetime import datetime, time as dt_time
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+from dataclasses import dataclass
+from datetime import datetime, timedelta, time as dt_time
 from automation.form_filler import FormFiller
-import json
+from automation.json_store import FORM_DATA_FILE, load_json_cached
 from pytz import timezone
 logger = logging.getLogger(__name__)
 
+# Schedule times are wall-clock times in this timezone
+SCHEDULE_TIMEZONE = timezone("Asia/Kolkata")
+
+@dataclass
+class AttemptEvent:
+    """automation_attempt payload; orjson serializes it without an intermediate dict"""
+    # Declared by hand because dataclass(slots=True) needs Python 3.10
+    __slots__ = ('attempt', 'max_attempts', 'timestamp')
+    attempt: int
+    max_attempts: int
+    timestamp: str
+
 class AutomationScheduler:
     """Handles scheduling of automated form submissions"""
     
@@ -27,15 +37,19 @@ class AutomationScheduler:
         self.config = config
         self.socketio = socketio
         
-
-        self.scheduler = BackgroundScheduler(
-            timezone=timezone("Asia/Kolkata")
-)
+        # Single-shot timer for the next run, re-armed after each run
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        self._next_run = None
+        
         self.form_filler = None
         self.username = None
         self.password = None
         self.running = False
         
+        # Set by stop() to cut short any retry wait in progress
+        self._stop_event = threading.Event()
+        
         # Load form data
         self.form_data = self._load_form_data()
         
@@ -46,10 +60,9 @@ class AutomationScheduler:
         
     def _load_form_data(self):
         """Load static form data"""
-        try:
-            with open('config/form_data.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
+        # Shared with app.py, so an unchanged file is parsed once per process
+        form_data = load_json_cached(FORM_DATA_FILE)
+        if form_data is None:
             logger.warning("Form data file not found, using defaults")
             return {
                 "ash_utilization": "Ash_based_Products",
@@ -62,19 +75,34 @@ class AutomationScheduler:
                 "dl_no": "7634",
                 "driver_mob_no": "9768453423"
             }
+        return form_data
     
     def _parse_schedule_time(self, time_str):
         """Parse schedule time string into hour, minute, second"""
-        try:
-            time_parts = time_str.split(':')
-            hour = int(time_parts[0])
-            minute = int(time_parts[1])
-            second = int(time_parts[2]) if len(time_parts) > 2 else 0
-            
-            return dt_time(hour, minute, second)
-        except Exception as e:
-            logger.error(f"Invalid schedule time format: {time_str}, using default 07:00:01")
-            return dt_time(7, 0, 1)
+        for time_format in ('%H:%M:%S', '%H:%M'):
+            try:
+                return datetime.strptime(time_str, time_format).time()
+            except (TypeError, ValueError):
+                continue
+        
+        logger.error(f"Invalid schedule time format: {time_str}, using default 07:00:01")
+        return dt_time(7, 0, 1)
+    
+    def _emit(self, event, **fields):
+        """Emit an event with a timestamp, skipping all work when there is no SocketIO"""
+        if self.socketio is None:
+            return
+        fields.setdefault('timestamp', datetime.now().isoformat())
+        self.socketio.emit(event, fields)
+    
+    def _emit_attempt(self, attempt, max_attempts):
+        """Emit automation_attempt as a slotted event object"""
+        if self.socketio is None:
+            return
+        self.socketio.emit(
+            'automation_attempt',
+            AttemptEvent(attempt, max_attempts, datetime.now().isoformat())
+        )
     
     def set_credentials(self, username, password):
         """Set login credentials"""
@@ -92,33 +120,21 @@ class AutomationScheduler:
                 logger.error("Credentials not set")
                 return False
             
-            # Schedule the job
-            self.scheduler.add_job(
-                func=self._run_automation,
-                trigger=CronTrigger(
-                    hour=self.schedule_time.hour,
-                    minute=self.schedule_time.minute,
-                    second=self.schedule_time.second,
-                    timezone="Asia/Kolkata"
-                ),
-                id='form_submission',
-                name='KPCL Form Submission',
-                replace_existing=True
-            )
-            
-            # Start the scheduler
-            self.scheduler.start()
+            self._stop_event.clear()
             self.running = True
             
+            # Arm the timer for the next run
+            self._schedule_next()
+            
             logger.info(f"Scheduler started. Next run at {self.schedule_time}")
             
             # Emit status update
-            if self.socketio:
-                self.socketio.emit('scheduler_status', {
-                    'running': True,
-                    'next_run': self.get_next_run_time(),
-                    'schedule_time': str(self.schedule_time)
-                })
+            self._emit(
+                'scheduler_status',
+                running=True,
+                next_run=self.get_next_run_time(),
+                schedule_time=str(self.schedule_time)
+            )
             
             return True
             
@@ -129,18 +145,19 @@ class AutomationScheduler:
     def stop(self):
         """Stop the scheduler"""
         try:
-            if self.scheduler.running:
-                self.scheduler.shutdown()
-            
+            self._stop_event.set()
             self.running = False
+            
+            with self._timer_lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                self._next_run = None
+
             logger.info("Scheduler stopped")
             
             # Emit status update
-            if self.socketio:
-                self.socketio.emit('scheduler_status', {
-                    'running': False,
-                    'next_run': None
-                })
+            self._emit('scheduler_status', running=False, next_run=None)
             
         except Exception as e:
             logger.error(f"Error stopping scheduler: {e}")
@@ -148,28 +165,59 @@ class AutomationScheduler:
     def get_next_run_time(self):
         """Get the next scheduled run time"""
         try:
-            if self.scheduler.running:
-                jobs = self.scheduler.get_jobs()
-                if jobs:
-                    next_run = jobs[0].next_run_time
-                    if next_run:
-                        return next_run.isoformat()
+            with self._timer_lock:
+                if self.running and self._next_run:
+                    return self._next_run.isoformat()
             return None
         except Exception as e:
             logger.error(f"Error getting next run time: {e}")
             return None
     
+    def _seconds_until_next_run(self):
+        """
+        Work out when schedule_time next comes round
+        
+        Returns:
+            tuple: (seconds until the run, datetime of the run)
+        """
+        now = datetime.now(SCHEDULE_TIMEZONE)
+        next_run = now.replace(
+            hour=self.schedule_time.hour,
+            minute=self.schedule_time.minute,
+            second=self.schedule_time.second,
+            microsecond=0
+        )
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds(), next_run
+    
+    def _schedule_next(self):
+        """Arm the timer for the next run, replacing any pending one"""
+        delay, next_run = self._seconds_until_next_run()
+        
+        with self._timer_lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._run_and_reschedule)
+            self._timer.daemon = True
+            self._next_run = next_run
+            self._timer.start()
+    
+    def _run_and_reschedule(self):
+        """Timer callback: run today's automation, then arm tomorrow's"""
+        try:
+            self._run_automation()
+        finally:
+            if self.running and not self._stop_event.is_set():
+                self._schedule_next()
+    
     def _run_automation(self):
         """Run the automation process"""
         logger.info("Starting scheduled automation run")
         
         try:
             # Emit start event
-            if self.socketio:
-                self.socketio.emit('automation_started', {
-                    'timestamp': datetime.now().isoformat(),
-                    'type': 'scheduled'
-                })
+            self._emit('automation_started', type='scheduled')
             
             # Initialize form filler
             self.form_filler = FormFiller(self.config, self.socketio)
@@ -188,58 +236,46 @@ class AutomationScheduler:
                 
                 try:
                     # Emit attempt status
-                    if self.socketio:
-                        self.socketio.emit('automation_attempt', {
-                            'attempt': attempt,
-                            'max_attempts': max_retries,
-                            'timestamp': datetime.now().isoformat()
-                        })
+                    self._emit_attempt(attempt, max_retries)
                     
                     # Submit form
-                    success, message = self.form_filler.submit_form(self.form_data, max_retries=1)
+                    success, message = self.form_filler.submit_form(
+                        self.form_data, max_retries=1, attempt=attempt
+                    )
                     
                     if success:
                         logger.info(f"Automation successful on attempt {attempt}")
                         
                         # Emit success event
-                        if self.socketio:
-                            self.socketio.emit('automation_success', {
-                                'attempt': attempt,
-                                'message': message,
-                                'timestamp': datetime.now().isoformat()
-                            })
+                        self._emit('automation_success', attempt=attempt, message=message)
                         break
                     else:
                         logger.warning(f"Automation attempt {attempt} failed: {message}")
                         
                         # Emit failure event
-                        if self.socketio:
-                            self.socketio.emit('automation_attempt_failed', {
-                                'attempt': attempt,
-                                'message': message,
-                                'timestamp': datetime.now().isoformat()
-                            })
+                        self._emit(
+                            'automation_attempt_failed',
+                            attempt=attempt,
+                            message=message
+                        )
                         
                         # Wait before retry (except on last attempt)
                         if attempt < max_retries:
                             logger.info(f"Waiting {retry_interval} seconds before retry")
-                            time.sleep(retry_interval)
+                            if self._stop_event.wait(retry_interval):
+                                break
                 
                 except Exception as e:
                     error_msg = f"Error in automation attempt {attempt}: {str(e)}"
                     logger.error(error_msg)
                     
                     # Emit error event
-                    if self.socketio:
-                        self.socketio.emit('automation_error', {
-                            'attempt': attempt,
-                            'error': str(e),
-                            'timestamp': datetime.now().isoformat()
-                        })
+                    self._emit('automation_error', attempt=attempt, error=str(e))
                     
                     # Wait before retry (except on last attempt)
                     if attempt < max_retries:
-                        time.sleep(retry_interval)
+                        if self._stop_event.wait(retry_interval):
+                            break
             
             # Final result
             if not success:
@@ -247,11 +283,7 @@ class AutomationScheduler:
                 logger.error(final_message)
                 
                 # Emit final failure event
-                if self.socketio:
-                    self.socketio.emit('automation_final_failure', {
-                        'total_attempts': max_retries,
-                        'timestamp': datetime.now().isoformat()
-                    })
+                self._emit('automation_final_failure', total_attempts=max_retries)
             
             # Cleanup
             if self.form_filler:
@@ -259,12 +291,7 @@ class AutomationScheduler:
                 self.form_filler = None
             
             # Emit completion event
-            if self.socketio:
-                self.socketio.emit('automation_completed', {
-                    'success': success,
-                    'total_attempts': attempt,
-                    'timestamp': datetime.now().isoformat()
-                })
+            self._emit('automation_completed', success=success, total_attempts=attempt)
             
             logger.info("Scheduled automation run completed")
             
@@ -273,11 +300,7 @@ class AutomationScheduler:
             logger.error(error_msg)
             
             # Emit fatal error event
-            if self.socketio:
-                self.socketio.emit('automation_fatal_error', {
-                    'error': str(e),
-                    'timestamp': datetime.now().isoformat()
-                })
+            self._emit('automation_fatal_error', error=str(e))
             
             # Cleanup
             try:
@@ -300,11 +323,7 @@ class AutomationScheduler:
         """Manual automation run in separate thread"""
         try:
             # Emit start event
-            if self.socketio:
-                self.socketio.emit('automation_started', {
-                    'timestamp': datetime.now().isoformat(),
-                    'type': 'manual'
-                })
+            self._emit('automation_started', type='manual')
             
             # Initialize form filler
             form_filler = FormFiller(self.config, self.socketio)
@@ -314,20 +333,10 @@ class AutomationScheduler:
             success, message = form_filler.submit_form(self.form_data)
             
             # Emit result
-            if self.socketio:
-                if success:
-                    self.socketio.emit('automation_success', {
-                        'attempt': 1,
-                        'message': message,
-                        'timestamp': datetime.now().isoformat(),
-                        'type': 'manual'
-                    })
-                else:
-                    self.socketio.emit('automation_failure', {
-                        'message': message,
-                        'timestamp': datetime.now().isoformat(),
-                        'type': 'manual'
-                    })
+            if success:
+                self._emit('automation_success', attempt=1, message=message, type='manual')
+            else:
+                self._emit('automation_failure', message=message, type='manual')
             
             # Cleanup
             form_filler.cleanup()
@@ -338,44 +347,30 @@ class AutomationScheduler:
             error_msg = f"Error in manual automation: {str(e)}"
             logger.error(error_msg)
             
-            if self.socketio:
-                self.socketio.emit('automation_error', {
-                    'error': str(e),
-                    'timestamp': datetime.now().isoformat(),
-                    'type': 'manual'
-                })
+            self._emit('automation_error', error=str(e), type='manual')
     
     def update_schedule(self, new_time):
         """Update the schedule time"""
         try:
-            self.schedule_time = self._parse_schedule_time(new_time)
+            schedule_time = self._parse_schedule_time(new_time)
+            if schedule_time == self.schedule_time:
+                # Pending timer already targets this time
+                return True
+            self.schedule_time = schedule_time
             
             if self.running:
-                # Remove existing job
-                self.scheduler.remove_job('form_submission')
-                
-                # Add new job with updated time
-                self.scheduler.add_job(
-                    func=self._run_automation,
-                    trigger=CronTrigger(
-                        hour=self.schedule_time.hour,
-                        minute=self.schedule_time.minute,
-                        second=self.schedule_time.second
-                    ),
-                    id='form_submission',
-                    name='KPCL Form Submission',
-                    replace_existing=True
-                )
+                # Re-arm the timer for the new time
+                self._schedule_next()
                 
                 logger.info(f"Schedule updated to {self.schedule_time}")
                 
                 # Emit status update
-                if self.socketio:
-                    self.socketio.emit('scheduler_status', {
-                        'running': True,
-                        'next_run': self.get_next_run_time(),
-                        'schedule_time': str(self.schedule_time)
-                    })
+                self._emit(
+                    'scheduler_status',
+                    running=True,
+                    next_run=self.get_next_run_time(),
+                    schedule_time=str(self.schedule_time)
+                )
             
             return True
             
@@ -2,9 +2,17 @@
 Selenium WebDriver handler for browser automation
 """
 
+import atexit
+import functools
 import logging
+import socket
+import threading
 import time
+import types
 import os
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -13,15 +21,201 @@ from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, NoAlertPresentException, WebDriverException
+)
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.firefox import GeckoDriverManager
 import shutil
+from pathlib import Path
 logger = logging.getLogger(__name__)
 
+# Remembers the chromedriver that last worked across process restarts
+DRIVER_PATH_CACHE = Path.home() / ".cache" / "kpcl" / "chromedriver_path"
+
+# Launch flags for a fresh Chrome: server stability, fixed window, a UA
+# without a hardcoded version, and images off
+_BASE_CHROME_ARGS = (
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--window-size=1920,1080",
+    "--user-agent=Mozilla/5.0 (X11; Linux x86_64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome Safari/537.36",
+    "--blink-settings=imagesEnabled=false",
+)
+
+# Disable notifications, images
+_BASE_CHROME_PREFS = types.MappingProxyType({
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.managed_default_content_settings.images": 2,
+})
+
+# Project-local chromedriver, checked before webdriver-manager
+LOCAL_CHROMEDRIVER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "chromedriver")
+
+@functools.lru_cache(maxsize=1)
+def _local_chromedriver():
+    """Return the project-local chromedriver if present; looked up once per process"""
+    return LOCAL_CHROMEDRIVER if os.path.exists(LOCAL_CHROMEDRIVER) else None
+
+@functools.lru_cache(maxsize=1)
+def _system_chromedriver():
+    """Return chromedriver from PATH if present; looked up once per process"""
+    return shutil.which("chromedriver")
+
+# Background driver teardowns still running; joined briefly at exit
+_quit_threads = []
+_quit_threads_lock = threading.Lock()
+
+def _join_quit_threads(timeout=2.0):
+    """Give pending driver teardowns up to timeout seconds in total to finish"""
+    deadline = time.monotonic() + timeout
+    with _quit_threads_lock:
+        pending = list(_quit_threads)
+    for thread in pending:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+atexit.register(_join_quit_threads)
+
+def _teardown_driver(driver):
+    """Quit a driver; runs on a background thread"""
+    try:
+        driver.quit()
+        logger.info("WebDriver stopped")
+    except Exception as e:
+        logger.error(f"Error stopping WebDriver: {e}")
+    finally:
+        with _quit_threads_lock:
+            _quit_threads.remove(threading.current_thread())
+
+# Chrome profile that keeps the site's login cookies between browser starts;
+# it holds an authenticated session, so it lives with the app and is owner-only
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "chrome_profile")
+
+# Persistent-session mode: Chrome outlives the process and is re-attached over CDP
+DEFAULT_DEBUG_PORT = 9222
+
+# Minimum seconds between element-not-found screenshots
+FAILURE_SCREENSHOT_INTERVAL = 10
+
+# Resources Chrome is told not to fetch at all; CSS stays because the
+# page's visibility checks depend on it
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm", "*.mp3",
+    "*analytics*", "*googletagmanager*", "*doubleclick*",
+]
+
+# Scrolls without animation, then resolves once the element stops moving
+# (at most ~200 ms, for browsers that still animate the scroll)
+SCROLL_INTO_VIEW_SCRIPT = """
+const el = arguments[0];
+const done = arguments[arguments.length - 1];
+el.scrollIntoView({block: 'center', inline: 'center', behavior: 'instant'});
+const start = performance.now();
+let last = el.getBoundingClientRect().top;
+function settle() {
+    requestAnimationFrame(() => {
+        const top = el.getBoundingClientRect().top;
+        if (top === last || performance.now() - start > 200) {
+            done(true);
+            return;
+        }
+        last = top;
+        settle();
+    });
+}
+settle();
+"""
+
+# Writes (selector, value) pairs in one call; selects are matched by option text
+BATCH_FILL_SCRIPT = """
+const fire = (el) => {
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+};
+return arguments[0].map(([selector, value]) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    if (el.tagName === 'SELECT') {
+        const option = [...el.options].find(o => o.text.trim() === value);
+        if (!option) return false;
+        el.value = option.value;
+    } else {
+        el.value = value;
+    }
+    fire(el);
+    return true;
+});
+"""
+
+# Reads the value (or text, for non-inputs) of each selector in one call
+BATCH_READ_SCRIPT = """
+return arguments[0].map((selector) => {
+    const el = document.querySelector(selector);
+    if (!el) return null;
+    return 'value' in el ? el.value : el.textContent;
+});
+"""
+
+# Extracts the requested fields from every match; 'text' is the trimmed textContent
+QUERY_ALL_SCRIPT = """
+const fields = arguments[1];
+return Array.from(document.querySelectorAll(arguments[0])).map((el) => {
+    const row = {};
+    for (const field of fields) {
+        if (field === 'text') {
+            row[field] = el.textContent.trim();
+        } else {
+            const prop = el[field];
+            row[field] = (prop !== undefined && prop !== null && typeof prop !== 'object')
+                ? prop : el.getAttribute(field);
+        }
+    }
+    return row;
+});
+"""
+
+# Default WebDriver async script timeout, restored after longer waits
+DEFAULT_SCRIPT_TIMEOUT = 30
+
+# Stores a promise that resolves once the element with the given id is rendered
+# visibly, driven by a MutationObserver instead of WebDriver polling
+WATCH_VISIBLE_SCRIPT = """
+const id = arguments[0];
+window.__kpclWatches = window.__kpclWatches || {};
+window.__kpclWatches[id] = new Promise((resolve) => {
+    const visible = () => {
+        const el = document.getElementById(id);
+        return !!(el && el.offsetParent);
+    };
+    if (visible()) { resolve(true); return; }
+    const observer = new MutationObserver(() => {
+        if (visible()) { observer.disconnect(); resolve(true); }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+});
+"""
+
+# Resolves with the watch's result, or null if the page no longer holds the watch
+AWAIT_VISIBLE_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const watch = window.__kpclWatches && window.__kpclWatches[arguments[0]];
+if (!watch) { done(null); return; }
+watch.then(done);
+"""
+
 class SeleniumHandler:
     """Handles Selenium WebDriver operations"""
     
+    # chromedriver path resolved by the first successful start in this process
+    _cached_driver_path = None
+    
+    # Monotonic time of the last element-not-found screenshot in this process
+    _last_failure_screenshot = float('-inf')
+    
     def __init__(self, config):
         """
         Initialize Selenium handler
@@ -32,12 +226,29 @@ class SeleniumHandler:
         self.config = config
         self.driver = None
         self.wait = None
+        # WebDriverWait instances keyed by timeout, bound to the current driver
+        self._waits = {}
+        # (url, monotonic time) of the last URL read; cleared by anything that navigates
+        self._url_cache = None
+        # Values callers read from the loaded page (e.g. its CSRF token); cleared with _url_cache
+        self.page_values = {}
+        
+    def start_driver(self, warm_url=None):
+        """
+        Start the WebDriver with retry logic
         
-    def start_driver(self):
-        """Start the WebDriver with retry logic"""
+        Args:
+            warm_url (str): URL whose DNS and TLS setup is warmed up while the browser launches
+            
+        Returns:
+            bool: True if the driver started
+        """
         max_retries = 3
         retry_count = 0
         
+        if warm_url:
+            threading.Thread(target=self._prewarm, args=(warm_url,), name='driver-prewarm', daemon=True).start()
+        
         while retry_count < max_retries:
             try:
                 browser = self.config.get('browser', 'chrome').lower()
@@ -56,11 +267,20 @@ class SeleniumHandler:
                     raise Exception("WebDriver creation returned None")
                 
                 # Set up WebDriverWait
-                self.wait = WebDriverWait(self.driver, 30)
+                self._waits = {}
+                self._page_changed()
+                self.wait = self._wait(30)
+                
+                # Configure driver settings; every lookup here waits explicitly,
+                # and an implicit wait would stall each WebDriverWait poll on a miss
+                self.driver.implicitly_wait(0)
                 
-                # Configure driver settings
-                self.driver.implicitly_wait(10)
-                self.driver.maximize_window()
+                # The window is already sized by launch flags; maximizing is opt-in
+                if self.config.get('maximize', False):
+                    self.driver.maximize_window()
+                
+                if browser == 'chrome':
+                    self._block_heavy_resources()
                 
                 logger.info(f"WebDriver started successfully: {browser}")
                 return True
@@ -84,6 +304,65 @@ class SeleniumHandler:
                     logger.error("All WebDriver start attempts failed")
                     return False
     
+    def _block_heavy_resources(self):
+        """Block images, fonts, media and trackers at the network layer via CDP"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logger.warning(f"Could not block heavy resources: {e}")
+    
+    @staticmethod
+    def _debugger_alive(port):
+        """Return True if something accepts connections on the debugging port"""
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            return False
+    
+    @staticmethod
+    def _prewarm(url):
+        """Resolve and contact url so the first navigation finds warm caches"""
+        try:
+            parts = urlsplit(url)
+            socket.getaddrinfo(parts.hostname, parts.port or 443)
+            requests.head(url, timeout=5, allow_redirects=False)
+        except Exception as e:
+            logger.debug(f"Prewarm of {url} failed: {e}")
+    
+    @classmethod
+    def _load_driver_path(cls):
+        """Return the remembered chromedriver path, if it still exists"""
+        if cls._cached_driver_path is None:
+            try:
+                cls._cached_driver_path = DRIVER_PATH_CACHE.read_text().strip() or None
+            except OSError:
+                return None
+        
+        if cls._cached_driver_path and os.path.exists(cls._cached_driver_path):
+            return cls._cached_driver_path
+        return None
+    
+    @classmethod
+    def _remember_driver_path(cls, path):
+        """Remember a working chromedriver path in memory and on disk"""
+        cls._cached_driver_path = path
+        try:
+            DRIVER_PATH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            DRIVER_PATH_CACHE.write_text(path)
+        except OSError as e:
+            logger.debug(f"Could not persist chromedriver path: {e}")
+    
+    @classmethod
+    def _forget_driver_path(cls):
+        """Drop a remembered chromedriver path that stopped working"""
+        cls._cached_driver_path = None
+        try:
+            DRIVER_PATH_CACHE.unlink()
+        except OSError:
+            pass
+    
     def _create_chrome_driver(self, headless=True):
         """
         Robust Chrome WebDriver factory.
@@ -92,48 +371,70 @@ class SeleniumHandler:
 
         options = ChromeOptions()
 
-        if headless:
-            options.add_argument("--headless=new")
-
-        # Server stability flags
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-
-        # ⚠️ REMOVE remote-debugging unless you really need it
-        # options.add_argument("--remote-debugging-port=9222")
-
-        # ✅ DO NOT hardcode Chrome version in UA
-        options.add_argument(
-            "--user-agent=Mozilla/5.0 (X11; Linux x86_64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome Safari/537.36"
-        )
+        # get() returns once the DOM is parsed instead of after every subresource
+        options.page_load_strategy = 'eager'
 
-        # Disable notifications, images
-        prefs = {
-            "profile.default_content_setting_values.notifications": 2,
-            "profile.managed_default_content_settings.images": 2,
-        }
-        options.add_experimental_option("prefs", prefs)
+        persistent = self.config.get('persistent_session', False)
+        port = self.config.get('debug_port', DEFAULT_DEBUG_PORT)
+        attach = persistent and self._debugger_alive(port)
+
+        if attach:
+            # Chrome is still running from an earlier session; launch flags don't apply
+            logger.info(f"Attaching to running Chrome on port {port}")
+            options.debugger_address = f"127.0.0.1:{port}"
+        else:
+            if headless:
+                options.add_argument("--headless=new")
+
+            for argument in _BASE_CHROME_ARGS:
+                options.add_argument(argument)
+
+            # Capabilities are JSON-encoded, so hand over a plain copy
+            options.add_experimental_option("prefs", dict(_BASE_CHROME_PREFS))
+
+            # Chrome persists cookies in the profile, so a login survives restarts
+            profile_dir = self.config.get('profile_dir', DEFAULT_PROFILE_DIR)
+            os.makedirs(profile_dir, mode=0o700, exist_ok=True)
+            os.chmod(profile_dir, 0o700)
+            options.add_argument(f"--user-data-dir={profile_dir}")
+            options.add_argument("--profile-directory=Default")
 
-        # macOS binary (ignored on Linux)
-        mac_chrome = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-        if os.path.exists(mac_chrome):
-            options.binary_location = mac_chrome
+            # macOS binary (ignored on Linux)
+            mac_chrome = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+            if os.path.exists(mac_chrome):
+                options.binary_location = mac_chrome
 
+            if persistent:
+                # Leave Chrome running when this process exits so the next start can attach
+                options.add_argument(f"--remote-debugging-port={port}")
+                options.add_experimental_option("detach", True)
+
+        return self._start_chrome(options)
+
+    def _start_chrome(self, options):
+        """Start Chrome with the first chromedriver that works"""
         errors = []
 
+        # -------- Method 0: Previously resolved chromedriver --------
+        cached_driver = self._load_driver_path()
+        if cached_driver:
+            try:
+                logger.info("Using cached ChromeDriver path")
+                service = ChromeService(cached_driver)
+                return webdriver.Chrome(service=service, options=options)
+            except Exception as e:
+                errors.append(f"Cached chromedriver failed: {e}")
+                self._forget_driver_path()
+
         # -------- Method 1: Local chromedriver --------
         try:
-            local_driver = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)), "chromedriver"
-            )
-            if os.path.exists(local_driver):
+            local_driver = _local_chromedriver()
+            if local_driver:
                 logger.info("Using local project ChromeDriver")
                 service = ChromeService(local_driver)
-                return webdriver.Chrome(service=service, options=options)
+                driver = webdriver.Chrome(service=service, options=options)
+                self._remember_driver_path(local_driver)
+                return driver
         except Exception as e:
             errors.append(f"Local chromedriver failed: {e}")
 
@@ -145,18 +446,22 @@ class SeleniumHandler:
 
             # ✅ DO NOT manipulate path on Linux/macOS
             service = ChromeService(driver_path)
-            return webdriver.Chrome(service=service, options=options)
+            driver = webdriver.Chrome(service=service, options=options)
+            self._remember_driver_path(driver_path)
+            return driver
 
         except Exception as e:
             errors.append(f"WebDriverManager failed: {e}")
 
         # -------- Method 3: System PATH --------
         try:
-            chromedriver_path = shutil.which("chromedriver")
+            chromedriver_path = _system_chromedriver()
             if chromedriver_path:
                 logger.info("Using system PATH chromedriver")
                 service = ChromeService(chromedriver_path)
-                return webdriver.Chrome(service=service, options=options)
+                driver = webdriver.Chrome(service=service, options=options)
+                self._remember_driver_path(chromedriver_path)
+                return driver
         except Exception as e:
             errors.append(f"System chromedriver failed: {e}")
 
@@ -179,23 +484,89 @@ class SeleniumHandler:
         service = FirefoxService(GeckoDriverManager().install())
         return webdriver.Firefox(service=service, options=options)
     
+    def is_alive(self):
+        """
+        Check that the browser still answers WebDriver commands
+        
+        Returns:
+            bool: False if there is no driver or it is gone
+        """
+        if not self.driver:
+            return False
+        try:
+            self.driver.window_handles
+            return True
+        except Exception as e:
+            # A dead chromedriver surfaces as a connection error, not a WebDriverException
+            logger.warning(f"Browser is not responding: {e}")
+            return False
+    
     def stop_driver(self):
         """Stop the WebDriver"""
+        driver = self.driver
+        if not driver:
+            return
+        
+        # Forget the driver now; the slow quit happens in the background
+        self.driver = None
+        self.wait = None
+        self._waits = {}
+        self._page_changed()
+        
+        thread = threading.Thread(
+            target=_teardown_driver, args=(driver,), name='driver-quit', daemon=True
+        )
+        with _quit_threads_lock:
+            _quit_threads.append(thread)
+        thread.start()
+    
+    def _wait(self, timeout):
+        """Return a cached WebDriverWait for timeout that polls every 100 ms"""
+        wait = self._waits.get(timeout)
+        if wait is None:
+            wait = WebDriverWait(
+                self.driver, timeout, poll_frequency=0.1,
+                ignored_exceptions=(NoSuchElementException,)
+            )
+            self._waits[timeout] = wait
+        return wait
+    
+    def wait_until(self, condition, timeout=10):
+        """
+        Poll an expected condition every 100 ms instead of sleeping a fixed time
+        
+        Args:
+            condition (callable): Expected condition taking the driver
+            timeout (int): Maximum seconds to wait
+            
+        Returns:
+            The condition's truthy result, or False if it timed out
+        """
+        if not self.driver:
+            return False
         try:
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
-                self.wait = None
-                logger.info("WebDriver stopped")
-        except Exception as e:
-            logger.error(f"Error stopping WebDriver: {e}")
+            return self._wait(timeout).until(condition)
+        except TimeoutException:
+            return False
+        except WebDriverException as e:
+            logger.error(f"Error while waiting for condition: {e}")
+            return False
     
     def navigate_to(self, url):
-        """Navigate to a URL"""
+        """
+        Navigate to a URL, reloading it if the browser is already there
+        
+        Args:
+            url (str): Target URL
+            
+        Returns:
+            bool: True if the browser is on url
+        """
         try:
             if not self.driver:
                 raise Exception("WebDriver not started")
             
+            self._page_changed()
             self.driver.get(url)
             logger.info(f"Navigated to: {url}")
             return True
@@ -207,37 +578,70 @@ class SeleniumHandler:
     def find_element(self, by, value, timeout=10):
         """Find an element with timeout"""
         try:
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             element = wait.until(EC.presence_of_element_located((by, value)))
             return element
         except TimeoutException:
             logger.warning(f"Element not found: {by}={value}")
             return None
+        except WebDriverException as e:
+            logger.error(f"Error finding element {by}={value}: {e}")
+            return None
     
-    def find_elements(self, by, value):
-        """Find multiple elements"""
+    @contextmanager
+    def _implicit(self, seconds):
+        """Temporarily set the implicit wait, restoring the zero default afterwards"""
+        self.driver.implicitly_wait(seconds)
         try:
+            yield
+        finally:
+            self.driver.implicitly_wait(0)
+    
+    def find_elements(self, by, value, timeout=0):
+        """Find multiple elements, optionally waiting up to timeout for the first"""
+        try:
+            if timeout:
+                with self._implicit(timeout):
+                    return self.driver.find_elements(by, value)
             return self.driver.find_elements(by, value)
-        except Exception as e:
-            logger.error(f"Error finding elements: {e}")
+        except WebDriverException as e:
+            logger.error(f"Error finding elements {by}={value}: {e}")
+            return []
+    
+    def query_all(self, css, extract=('text',)):
+        """
+        Read fields from every element matching a selector in one round-trip
+        
+        Args:
+            css (str): CSS selector to match
+            extract (list): Fields per element; 'text' or any property/attribute name
+            
+        Returns:
+            list: One dict per matched element
+        """
+        try:
+            return self.driver.execute_script(QUERY_ALL_SCRIPT, css, list(extract)) or []
+        except WebDriverException as e:
+            logger.error(f"Failed to query {css}: {e}")
             return []
     
     def click_element(self, by, value, timeout=10):
         """Click an element"""
         try:
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             element = wait.until(EC.element_to_be_clickable((by, value)))
+            self._page_changed()
             element.click()
             logger.debug(f"Clicked element: {by}={value}")
             return True
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to click element {by}={value}: {e}")
             return False
     
     def send_keys(self, by, value, text, timeout=10, clear=True):
         """Send keys to an element"""
         try:
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             element = wait.until(EC.presence_of_element_located((by, value)))
             
             if clear:
@@ -247,7 +651,7 @@ class SeleniumHandler:
             logger.debug(f"Sent keys to element: {by}={value}")
             return True
             
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to send keys to {by}={value}: {e}")
             return False
     
@@ -256,7 +660,7 @@ class SeleniumHandler:
         try:
             from selenium.webdriver.support.ui import Select
             
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             element = wait.until(EC.presence_of_element_located((by, value)))
             
             select = Select(element)
@@ -264,55 +668,140 @@ class SeleniumHandler:
             logger.debug(f"Selected dropdown option: {text}")
             return True
             
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to select dropdown option: {e}")
             return False
     
     def wait_for_element(self, by, value, timeout=10):
         """Wait for element to be present"""
         try:
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             wait.until(EC.presence_of_element_located((by, value)))
             return True
         except TimeoutException:
             return False
+        except WebDriverException as e:
+            logger.error(f"Error waiting for element {by}={value}: {e}")
+            return False
     
     def wait_for_url_contains(self, text, timeout=10):
         """Wait for URL to contain specific text"""
         try:
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             wait.until(EC.url_contains(text))
             return True
         except TimeoutException:
             return False
+        except WebDriverException as e:
+            logger.error(f"Error waiting for URL containing {text}: {e}")
+            return False
+    
+    @staticmethod
+    def _css_for(by, value):
+        """Translate a locator to a CSS selector, or None if it has no CSS form"""
+        if by == By.CSS_SELECTOR:
+            return value
+        if by == By.ID:
+            return f'[id="{value}"]'
+        if by == By.NAME:
+            return f'[name="{value}"]'
+        return None
+    
+    def _read_by_css(self, script, css, timeout, *args):
+        """Wait for css to match, then run script on it; one round-trip per poll"""
+        try:
+            result = self._wait(timeout).until(
+                lambda driver: driver.execute_script(script, css, *args)
+            )
+        except TimeoutException:
+            logger.warning(f"Element not found: css selector={css}")
+            return None
+        except WebDriverException as e:
+            logger.error(f"Error reading css selector={css}: {e}")
+            return None
+        return result['v']
     
     def get_text(self, by, value, timeout=10):
         """Get text from an element"""
         try:
+            css = self._css_for(by, value)
+            if css:
+                return self._read_by_css(
+                    "const el = document.querySelector(arguments[0]);"
+                    "return el ? {v: el.innerText} : null;",
+                    css, timeout
+                )
+            
             element = self.find_element(by, value, timeout)
             if element:
                 return element.text
             return None
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to get text from {by}={value}: {e}")
             return None
     
     def get_attribute(self, by, value, attribute, timeout=10):
         """Get attribute value from an element"""
         try:
+            css = self._css_for(by, value)
+            if css:
+                # Like WebElement.get_attribute: live property first, then the attribute
+                return self._read_by_css(
+                    "const el = document.querySelector(arguments[0]);"
+                    "if (!el) return null;"
+                    "const p = el[arguments[1]];"
+                    "if (p !== undefined && p !== null && typeof p !== 'object' && typeof p !== 'function')"
+                    "  return {v: String(p)};"
+                    "return {v: el.getAttribute(arguments[1])};",
+                    css, timeout, attribute
+                )
+            
             element = self.find_element(by, value, timeout)
             if element:
                 return element.get_attribute(attribute)
             return None
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to get attribute {attribute} from {by}={value}: {e}")
             return None
     
+    def batch_fill(self, fields):
+        """
+        Fill several fields in a single round-trip
+        
+        Args:
+            fields (list): (css selector, value) pairs
+            
+        Returns:
+            list: One bool per field, True if it was filled
+        """
+        try:
+            return self.driver.execute_script(BATCH_FILL_SCRIPT, [list(f) for f in fields]) or []
+        except Exception as e:
+            logger.warning(f"Batched fill failed: {e}")
+            return [False] * len(fields)
+    
+    def batch_read(self, selectors):
+        """
+        Read several fields in a single round-trip
+        
+        Args:
+            selectors (list): CSS selectors to read
+            
+        Returns:
+            dict: Selector to value, None where the element is missing
+        """
+        try:
+            values = self.driver.execute_script(BATCH_READ_SCRIPT, list(selectors)) or []
+        except Exception as e:
+            logger.warning(f"Batched read failed: {e}")
+            values = []
+        return dict(zip(selectors, values))
+    
     def execute_script(self, script):
         """Execute JavaScript"""
         try:
             return self.driver.execute_script(script)
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to execute script: {e}")
             return None
     
@@ -322,22 +811,43 @@ class SeleniumHandler:
             if not filename:
                 timestamp = time.strftime("%Y%m%d_%H%M%S")
                 filename = f"screenshots/screenshot_{timestamp}.png"
+            elif not os.path.dirname(filename):
+                filename = os.path.join("screenshots", filename)
             
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            self.driver.save_screenshot(filename)
-            logger.info(f"Screenshot saved: {filename}")
+            # Capture on this thread, leave the disk write to a background one
+            png = self.driver.get_screenshot_as_png()
+            threading.Thread(
+                target=self._write_screenshot, args=(filename, png), daemon=True
+            ).start()
             return filename
             
         except Exception as e:
             logger.error(f"Failed to take screenshot: {e}")
             return None
     
+    def debug_screenshot(self, filename):
+        """Take a step-by-step debugging screenshot, only when debug_screenshots is enabled"""
+        if self.config.get('debug_screenshots', False):
+            return self.take_screenshot(filename)
+        return None
+    
+    @staticmethod
+    def _write_screenshot(filename, png):
+        """Write captured screenshot bytes to disk"""
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename, 'wb') as f:
+                f.write(png)
+            logger.info(f"Screenshot saved: {filename}")
+        except Exception as e:
+            logger.error(f"Failed to save screenshot {filename}: {e}")
+    
     def switch_to_frame(self, frame_reference):
         """Switch to a frame"""
         try:
             self.driver.switch_to.frame(frame_reference)
             return True
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to switch to frame: {e}")
             return False
     
@@ -346,17 +856,15 @@ class SeleniumHandler:
         try:
             self.driver.switch_to.default_content()
             return True
-        except Exception as e:
+        except WebDriverException as e:
             logger.error(f"Failed to switch to default content: {e}")
             return False
     
     def handle_alert(self, accept=True, timeout=10):
         """Handle JavaScript alert with timeout and robust error handling"""
         try:
-            from selenium.common.exceptions import TimeoutException, NoAlertPresentException
-            
             # Wait for alert to appear
-            WebDriverWait(self.driver, timeout).until(EC.alert_is_present())
+            self._wait(timeout).until(EC.alert_is_present())
             
             alert = self.driver.switch_to.alert
             text = alert.text
@@ -375,7 +883,7 @@ class SeleniumHandler:
         except NoAlertPresentException:
             logger.debug("No alert present")
             return None
-        except Exception as e:
+        except WebDriverException as e:
             logger.warning(f"Alert handling error: {e}")
             # Try to dismiss any alert that might exist
             try:
@@ -383,7 +891,7 @@ class SeleniumHandler:
                 alert.accept()
                 logger.info("Forced alert dismissal successful")
                 return "Alert dismissed (forced)"
-            except:
+            except WebDriverException:
                 pass
             return None
     
@@ -398,26 +906,41 @@ class SeleniumHandler:
         except Exception as e:
             logger.debug(f"Alert handling completed: {e}")
     
+    def _alert_if_present_nowait(self):
+        """Accept an alert that is already open; never waits for one"""
+        try:
+            alert = self.driver.switch_to.alert
+            text = alert.text
+            alert.accept()
+            logger.info(f"Alert handled: {text}")
+            return text
+        except NoAlertPresentException:
+            return None
+    
     def wait_for_element_robust(self, by, value, timeout=30):
         """Wait for element with optimized timeout and minimal alert handling"""
         try:
-            # Quick alert check without long timeout
-            self.handle_possible_alerts(timeout=1)
+            # Clear a stray alert without waiting for one to appear
+            self._alert_if_present_nowait()
             
             # Then wait for element
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             element = wait.until(EC.presence_of_element_located((by, value)))
             
             # Only handle alerts again if this is a clickable element that might trigger them
             if by == By.ID and ("btn" in value.lower() or "button" in value.lower()):
-                self.handle_possible_alerts(timeout=1)
+                self._alert_if_present_nowait()
             
             return element
             
         except Exception as e:
             logger.error(f"Failed to find element {by}={value}: {e}")
-            # Take screenshot for debugging
-            self.take_screenshot(f"element_not_found_{by}_{value}.png")
+            # Screenshot for debugging when enabled, at most one per interval
+            if self.config.get('screenshot_on_failure', False):
+                now = time.monotonic()
+                if now - SeleniumHandler._last_failure_screenshot >= FAILURE_SCREENSHOT_INTERVAL:
+                    SeleniumHandler._last_failure_screenshot = now
+                    self.take_screenshot(f"element_not_found_{by}_{value}.png")
             return None
     
     def scroll_to_element(self, by, value):
@@ -425,35 +948,117 @@ class SeleniumHandler:
         try:
             element = self.find_element(by, value)
             if element:
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                time.sleep(0.5)  # Wait for scroll to complete
+                self.driver.execute_async_script(SCROLL_INTO_VIEW_SCRIPT, element)
                 return True
             return False
         except Exception as e:
             logger.error(f"Failed to scroll to element: {e}")
             return False
     
-    def wait_for_page_load(self, timeout=30):
-        """Wait for page to load completely"""
+    def watch_visible(self, element_id):
+        """
+        Start watching for an element to become visible; call before the action that reveals it
+        
+        Args:
+            element_id (str): Element id to watch for
+            
+        Returns:
+            bool: True if the watch is installed
+        """
         try:
-            wait = WebDriverWait(self.driver, timeout)
-            wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
+            self.driver.execute_script(WATCH_VISIBLE_SCRIPT, element_id)
+            return True
+        except WebDriverException as e:
+            logger.warning(f"Could not watch for #{element_id}: {e}")
+            return False
+    
+    def await_visible(self, element_id, timeout=30):
+        """
+        Block until a watched element becomes visible
+        
+        Args:
+            element_id (str): Element id passed to watch_visible
+            timeout (int): Maximum seconds to wait
+            
+        Returns:
+            True once visible, False on timeout, or None if the watch was lost
+            (page reloaded, alert open) and the caller should poll instead
+        """
+        try:
+            self.driver.set_script_timeout(timeout)
+            return bool(self.driver.execute_async_script(AWAIT_VISIBLE_SCRIPT, element_id)) or None
+        except TimeoutException:
+            return False
+        except WebDriverException as e:
+            logger.warning(f"Lost watch for #{element_id}: {e}")
+            return None
+        finally:
+            try:
+                self.driver.set_script_timeout(DEFAULT_SCRIPT_TIMEOUT)
+            except WebDriverException:
+                pass
+    
+    def wait_for_page_load(self, timeout=30, strategy='eager'):
+        """
+        Wait for the page to load
+        
+        Args:
+            timeout (int): Seconds to wait
+            strategy (str): 'eager' returns once the DOM is parsed, 'complete'
+                also waits for every subresource
+            
+        Returns:
+            bool: True if the page reached the requested state
+        """
+        ready_states = ("complete",) if strategy == 'complete' else ("interactive", "complete")
+        try:
+            wait = self._wait(timeout)
+            wait.until(lambda driver: driver.execute_script("return document.readyState") in ready_states)
             return True
         except TimeoutException:
             logger.warning("Page load timeout")
             return False
+        except WebDriverException as e:
+            logger.error(f"Error waiting for page load: {e}")
+            return False
     
     def get_current_url(self):
         """Get current URL"""
         try:
-            return self.driver.current_url
+            url = self.driver.current_url
+            self._url_cache = (url, time.monotonic())
+            return url
         except Exception as e:
             logger.error(f"Failed to get current URL: {e}")
             return None
     
+    def _page_changed(self):
+        """Forget everything read from the page that was loaded"""
+        self._url_cache = None
+        self.page_values.clear()
+    
+    def get_current_url_cached(self, ttl=0.5):
+        """
+        Get the current URL, reusing a read from the last ttl seconds
+        
+        The cache is cleared by navigate_to, click_element and refresh_page;
+        after clicking an element directly, call get_current_url instead.
+        
+        Args:
+            ttl (float): Maximum age in seconds of a reusable read
+            
+        Returns:
+            str: Current URL or None
+        """
+        cached = self._url_cache
+        if cached and time.monotonic() - cached[1] < ttl:
+            return cached[0]
+        return self.get_current_url()
+    
     def refresh_page(self):
         """Refresh the current page"""
         try:
+            self._page_changed()
             self.driver.refresh()
             self.wait_for_page_load()
             return True
@@ -0,0 +1,142 @@
+"""
+Process-wide pool for the shared KPCL browser session
+"""
+
+import functools
+import logging
+import threading
+from contextlib import contextmanager
+from automation.session_manager import SessionManager
+
+logger = logging.getLogger(__name__)
+
+class SeleniumPool:
+    """
+    Holds the single browser session shared by request handlers and form fillers
+    
+    Every caller that drives the browser (navigates, logs in, submits) must
+    hold lease() for the whole operation, so a status check can never pull
+    the browser off the gatepass form halfway through a submission.
+    """
+
+    def __init__(self, config):
+        """
+        Initialize Selenium Pool
+
+        Args:
+            config (dict): Configuration dictionary
+        """
+        self.config = config
+        self._lock = threading.Lock()
+        self._session_manager = None
+        # Exclusive use of the browser; re-entrant so a lease holder can attach or reset
+        self._lease = threading.RLock()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Hold exclusive use of the pooled browser
+
+        Args:
+            timeout (float): Seconds to wait for the current holder; None waits
+                indefinitely, 0 does not wait
+
+        Yields:
+            bool: True if the lease is held; callers must not drive the browser otherwise
+        """
+        if timeout is None:
+            acquired = self._lease.acquire()
+        elif timeout <= 0:
+            acquired = self._lease.acquire(blocking=False)
+        else:
+            acquired = self._lease.acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._lease.release()
+
+    def get(self):
+        """Return the pooled session manager, creating it on first use"""
+        with self._lock:
+            if self._session_manager is None:
+                self._session_manager = SessionManager(self.config)
+            return self._session_manager
+
+    def update_config(self, config):
+        """
+        Use a new configuration from now on
+
+        Settings read per call (screenshots) apply at once; browser launch
+        settings apply the next time the driver starts, e.g. after reset().
+
+        Args:
+            config (dict): Configuration dictionary
+        """
+        with self._lock:
+            self.config = config
+            if self._session_manager:
+                self._session_manager.config = config
+                self._session_manager.selenium.config = config
+
+    def ensure_attached(self):
+        """
+        Start the pooled browser session if it is not running
+
+        Returns:
+            bool: True if a browser session is attached
+        """
+        session_manager = self.get()
+
+        # Starting the session navigates, so it needs the lease like any other driver use
+        with self.lease():
+            if session_manager.selenium.driver:
+                return True
+
+            logger.info("Attaching pooled browser session")
+            return session_manager.start_session()
+
+    def reset(self):
+        """Stop the pooled browser session and forget it; callers should hold the lease"""
+        with self._lock:
+            session_manager = self._session_manager
+            self._session_manager = None
+
+        if session_manager:
+            session_manager.stop_session()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_selenium_pool(config=None):
+    """
+    Return the process-wide Selenium pool
+
+    Args:
+        config (dict): Configuration used if the pool does not exist yet
+
+    Returns:
+        SeleniumPool: The shared pool
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = SeleniumPool(config or {})
+        return _pool
+
+@functools.lru_cache(maxsize=1)
+def get_session_manager():
+    """
+    Return the pooled session manager with its browser attached
+
+    The attach happens once; call get_session_manager.cache_clear() after
+    tearing the pool down. A failed attach raises and is not cached.
+
+    Returns:
+        SessionManager: The attached session manager
+    """
+    pool = get_selenium_pool()
+    if not pool.ensure_attached():
+        raise RuntimeError("Failed to attach browser session")
+    return pool.get()
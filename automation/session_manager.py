@@ -2,37 +2,108 @@
 Session Manager for handling KPCL login and authentication
 """
 
+import enum
 import logging
+import re
 import time
+import requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from automation.selenium_handler import SeleniumHandler
 
 logger = logging.getLogger(__name__)
-import json,os
 
-def save_cookies(driver, path="cookies.json"):
-    with open(path, "w") as f:
-        json.dump(driver.get_cookies(), f)
-def load_cookies(driver, base_url, path="cookies.json"):
-    if not os.path.exists(path):
-        return False
+# Matches the URLs of the pages reached after a successful login
+LOGGED_IN_URL_RE = re.compile(r"dashboard|user")
 
-    driver.get(base_url)  # must be same domain
+class PageKind(enum.Enum):
+    """Which KPCL page a URL points at"""
+    LOGIN = "login"
+    GATEPASS = "gatepass"
+    DASHBOARD = "dashboard"
+    BLANK = "blank"
+    OTHER = "other"
 
-    with open(path, "r") as f:
-        cookies = json.load(f)
+# One pass over the URL; each optional lookahead records whether its keyword occurs
+_URL_CLASS_RE = re.compile(
+    r"(?=.*(?P<login>signin|login))?(?=.*(?P<gatepass>gatepass))?"
+    r"(?=.*(?P<dashboard>dashboard|user))?(?P<blank>data:|about:blank)?"
+)
 
-    for cookie in cookies:
-        cookie.pop("sameSite", None)  # Selenium compatibility
-        try:
-            driver.add_cookie(cookie)
-        except Exception:
-            pass
+# Match groups in priority order: the signin page wins over everything, and
+# the gatepass page lives under /user/ but is more specific than the dashboard
+_URL_CLASS_PRIORITY = (
+    ("login", PageKind.LOGIN),
+    ("gatepass", PageKind.GATEPASS),
+    ("dashboard", PageKind.DASHBOARD),
+    ("blank", PageKind.BLANK),
+)
+
+# Pages only reachable with a valid login
+LOGGED_IN_PAGES = frozenset((PageKind.GATEPASS, PageKind.DASHBOARD))
+
+def classify_url(url):
+    """
+    Classify a browser URL
+    
+    Args:
+        url (str): URL to classify; None counts as blank
+        
+    Returns:
+        PageKind: Kind of page the URL points at
+    """
+    if not url:
+        return PageKind.BLANK
+    groups = _URL_CLASS_RE.match(url).groupdict()
+    for name, kind in _URL_CLASS_PRIORITY:
+        if groups[name]:
+            return kind
+    return PageKind.OTHER
+
+# OTP flow locators
+OTP_SECTION_LOC = (By.ID, "otpSection")
+OTP_STATUS_LOC = (By.ID, "otpStatus")
+OTP_CODE_LOC = (By.ID, "otp_code")
+VERIFY_OTP_BTN_LOC = (By.ID, "verifyOtpBtn")
+SIGNIN_BTN_LOC = (By.ID, "signInBtn")
+GATEPASS_TOKEN_LOC = (By.NAME, "gatepass_token")
+
+# Page readiness conditions: the gatepass form has rendered or the site raised
+# an alert (e.g. invalid session); the signin form is back after logout
+GATEPASS_READY = EC.any_of(EC.presence_of_element_located(GATEPASS_TOKEN_LOC), EC.alert_is_present())
+SIGNIN_READY = EC.any_of(EC.presence_of_element_located((By.ID, "username")), EC.url_contains("signin"))
+
+# Seconds allowed for a plain-HTTP session check
+HTTP_CHECK_TIMEOUT = 10
+
+# The site reports an expired session with a JS alert on an otherwise normal page
+INVALID_SESSION_RE = re.compile(r"invalid session|session expired", re.IGNORECASE)
+
+# Only logged-in pages link to the gatepass form; its absence means the check is inconclusive
+DASHBOARD_MARKER = "gatepass.php"
+
+# The dashboard has rendered, the site redirected to signin, or it raised an alert
+DASHBOARD_READY = EC.any_of(
+    EC.presence_of_element_located((By.CSS_SELECTOR, f'a[href*="{DASHBOARD_MARKER}"]')),
+    EC.presence_of_element_located((By.ID, "username")),
+    EC.alert_is_present(),
+)
+
+# Login form elements, which the sign-in page renders together
+LOGIN_FIELD_IDS = ("username", "password", "generateOtpBtn")
+
+# Returns every requested element, or null once any of them is missing
+ELEMENTS_BY_ID_SCRIPT = """
+const els = arguments[0].map((id) => document.getElementById(id));
+return els.every((el) => el !== null) ? els : null;
+"""
+
+def _elements_present(ids):
+    """Expected condition that is truthy with all elements once every id is in the DOM"""
+    ids = list(ids)
+    return lambda driver: driver.execute_script(ELEMENTS_BY_ID_SCRIPT, ids)
 
-    driver.refresh()
-    return True
 class SessionManager:
     """Manages KPCL website sessions and authentication"""
     
@@ -50,42 +121,100 @@ class SessionManager:
         self.otp_required = False
         self.logged_in = False
         
+        # Plain HTTP client carrying the browser's login cookies
+        self.http_session = None
+        
         # KPCL URLs
         self.base_url = "https://kpcl-ams.com"
         self.login_url = f"{self.base_url}/signin_page.php"
         self.dashboard_url = f"{self.base_url}/user/dashboard.php"
         self.gatepass_url = f"{self.base_url}/user/gatepass.php"
+        self.logout_url = f"{self.base_url}/logout.php"
     
     def start_session(self):
         try:
-            success = self.selenium.start_driver()
+            success = self.selenium.start_driver(warm_url=self.dashboard_url)
             if not success:
                 logger.error("Failed to start browser session")
                 return False
 
             logger.info("Browser session started")
 
-            # 🔥 TRY COOKIE RESTORE HERE
-            restored = load_cookies(self.selenium.driver, self.base_url)
-            if restored:
-                logger.info("Cookies loaded, checking session validity")
-                if self.check_session_valid():
-                    self.logged_in = True
-                    self.otp_required = False
-                    logger.info("Session restored from cookies")
+            # The browser profile keeps cookies between runs, so a saved login
+            # lands on the dashboard; otherwise the site redirects to signin
+            if self.selenium.navigate_to(self.dashboard_url):
+                # One wait covers every outcome, so an alert is already open or never coming
+                self.selenium.wait_until(DASHBOARD_READY, timeout=3)
+                alert_text = self.selenium.handle_alert(accept=True, timeout=0)
+                current_url = self.selenium.get_current_url()
+                # An error or maintenance page is not a login
+                if (classify_url(current_url) in LOGGED_IN_PAGES
+                        and not (alert_text and "invalid session" in alert_text.lower())):
+                    self._on_logged_in()
+                    logger.info("Session restored from browser profile")
                 else:
-                    logger.info("Cookies present but session invalid")
+                    logger.info("No valid session in browser profile")
 
             return True
         except Exception as e:
             logger.error(f"Error starting session: {e}")
             return False
     
+    def _on_logged_in(self):
+        """Record a successful login and copy its cookies into http_session"""
+        self.logged_in = True
+        self.otp_required = False
+        
+        try:
+            http_session = requests.Session()
+            http_session.headers["User-Agent"] = self.selenium.driver.execute_script(
+                "return navigator.userAgent"
+            )
+            for cookie in self.selenium.driver.get_cookies():
+                http_session.cookies.set(
+                    cookie["name"], cookie["value"],
+                    domain=cookie.get("domain", ""), path=cookie.get("path", "/")
+                )
+            self.http_session = http_session
+        except Exception as e:
+            logger.warning(f"Could not build HTTP session from browser cookies: {e}")
+            self.http_session = None
+    
+    def check_session_http(self):
+        """
+        Check the login over plain HTTP without touching the browser
+        
+        Returns:
+            bool: True if the dashboard renders logged in, False if it redirects
+            to signin or reports an invalid session, None when there is no HTTP
+            session or the response is inconclusive (callers then ask the browser)
+        """
+        if not self.http_session:
+            return None
+        
+        try:
+            response = self.http_session.get(self.dashboard_url, timeout=HTTP_CHECK_TIMEOUT)
+        except requests.RequestException as e:
+            logger.warning(f"HTTP session check failed: {e}")
+            return None
+        
+        if classify_url(response.url) is PageKind.LOGIN or INVALID_SESSION_RE.search(response.text):
+            self.logged_in = False
+            self.http_session = None
+            return False
+        
+        if response.ok and DASHBOARD_MARKER in response.text:
+            return True
+        
+        logger.debug(f"HTTP session check inconclusive (status {response.status_code})")
+        return None
+    
     def stop_session(self):
         """Stop the browser session"""
         try:
             self.selenium.stop_driver()
             self.logged_in = False
+            self.http_session = None
             logger.info("Browser session stopped")
         except Exception as e:
             logger.error(f"Error stopping session: {e}")
@@ -106,9 +235,18 @@ class SessionManager:
             self.password = password
             
             # Start browser if not already started
+            just_started = False
             if not self.selenium.driver:
                 if not self.start_session():
                     return False, "Failed to start browser session"
+                just_started = True
+            
+            # A session restored from the browser profile needs no login page at all;
+            # start_session has already validated it, so only re-check one it didn't open
+            if self.logged_in and (just_started or self.check_session_valid()):
+                self.otp_required = False
+                logger.info("Already logged in, skipping login page")
+                return True, "Already logged in via cookies"
             
             # Navigate to login page
             logger.info("Navigating to login page")
@@ -119,56 +257,31 @@ class SessionManager:
             # Handle any initial alerts
             self.selenium.handle_possible_alerts(timeout=3)
             
-            # Wait for username field to be available (reduce timeout for immediate elements)
-            logger.info("Waiting for username field...")
-            username_start_time = time.time()
-            username_element = self.selenium.wait_for_element_robust(By.ID, "username", timeout=15)
-            if not username_element:
-                return False, "Username field not found"
-            
-            username_wait_time = time.time() - username_start_time
-            logger.info(f"Username field found after {username_wait_time:.2f} seconds")
-            
-            # Fill username
-            logger.info("Filling username")
-            username_fill_start = time.time()
-            username_element.clear()
-            username_element.send_keys(username)
-            username_fill_time = time.time() - username_fill_start
-            logger.info(f"Username filled in {username_fill_time:.2f} seconds")
-            
-            # Reduce alert handling after username (field typing shouldn't trigger alerts)
-            # self.selenium.handle_possible_alerts(timeout=5)  # Commented out to reduce delay
-            
-            # Wait for password field (should be immediate after username)
-            logger.info("Waiting for password field...")
-            password_start_time = time.time()
-            password_element = self.selenium.wait_for_element_robust(By.ID, "password", timeout=10)
-            if not password_element:
-                return False, "Password field not found"
-            
-            password_wait_time = time.time() - password_start_time
-            logger.info(f"Password field found after {password_wait_time:.2f} seconds")
-            
-            # Fill password
-            logger.info("Filling password")
-            password_fill_start = time.time()
-            password_element.clear()
-            password_element.send_keys(password)
-            password_fill_time = time.time() - password_fill_start
-            logger.info(f"Password filled in {password_fill_time:.2f} seconds")
+            # The form fields render together, so one wait covers all three
+            logger.info("Waiting for login form...")
+            form_start_time = time.time()
+            login_fields = self.selenium.wait_until(_elements_present(LOGIN_FIELD_IDS), timeout=15)
+            if not login_fields:
+                return False, "Login form not found"
+            otp_button = login_fields[-1]
+            
+            form_wait_time = time.time() - form_start_time
+            logger.info(f"Login form found after {form_wait_time:.2f} seconds")
+            
+            # Fill username and password in one script call instead of per-key send_keys
+            logger.info("Filling credentials")
+            fill_start = time.time()
+            filled = self.selenium.batch_fill([("#username", username), ("#password", password)])
+            if not all(filled):
+                return False, "Failed to fill login credentials"
+            fill_time = time.time() - fill_start
+            logger.info(f"Credentials filled in {fill_time:.2f} seconds")
             
             # Only handle alerts if OTP button click might trigger them
             
-            # Wait for Generate OTP button (should be immediate after password)
-            logger.info("Waiting for Generate OTP button...")
-            otp_button_start_time = time.time()
-            otp_button = self.selenium.wait_for_element_robust(By.ID, "generateOtpBtn", timeout=15)
-            if not otp_button:
-                return False, "Generate OTP button not found"
-            
-            otp_button_wait_time = time.time() - otp_button_start_time
-            logger.info(f"Generate OTP button found after {otp_button_wait_time:.2f} seconds")
+            # Watch for the OTP section in the page itself so its appearance is
+            # seen immediately rather than on the next poll
+            watching = self.selenium.watch_visible(OTP_SECTION_LOC[1])
             
             # Click Generate OTP button
             logger.info("Clicking Generate OTP button")
@@ -180,8 +293,11 @@ class SessionManager:
             
             # Wait for OTP section to appear with more aggressive timeout
             logger.info("Waiting for OTP section to become available...")
-            otp_section = self.selenium.wait_for_element_robust(By.ID, "otpSection", timeout=45)
-            if otp_section and otp_section.is_displayed():
+            otp_visible = self.selenium.await_visible(OTP_SECTION_LOC[1], timeout=45) if watching else None
+            if otp_visible is None:
+                otp_section = self.selenium.wait_for_element_robust(*OTP_SECTION_LOC, timeout=45)
+                otp_visible = bool(otp_section and otp_section.is_displayed())
+            if otp_visible:
                 otp_wait_time = time.time() - otp_start_time
                 logger.info(f"OTP section appeared after {otp_wait_time:.2f} seconds")
                 self.otp_required = True
@@ -189,7 +305,7 @@ class SessionManager:
                 return True, "OTP sent. Please enter OTP to continue."
             else:
                 # Check for error messages
-                error_element = self.selenium.find_element(By.ID, "otpStatus")
+                error_element = self.selenium.find_element(*OTP_STATUS_LOC)
                 if error_element:
                     error_text = error_element.text
                     if error_text:
@@ -216,7 +332,7 @@ class SessionManager:
                 return False, "OTP not required"
             
             # Wait for OTP field to be available
-            otp_element = self.selenium.wait_for_element_robust(By.ID, "otp_code", timeout=30)
+            otp_element = self.selenium.wait_for_element_robust(*OTP_CODE_LOC, timeout=30)
             if not otp_element:
                 return False, "OTP field not found"
             
@@ -229,7 +345,7 @@ class SessionManager:
             self.selenium.handle_possible_alerts(timeout=5)
             
             # Wait for Verify OTP button
-            verify_button = self.selenium.wait_for_element_robust(By.ID, "verifyOtpBtn", timeout=30)
+            verify_button = self.selenium.wait_for_element_robust(*VERIFY_OTP_BTN_LOC, timeout=30)
             if not verify_button:
                 return False, "Verify OTP button not found"
             
@@ -240,75 +356,52 @@ class SessionManager:
             # Handle alerts immediately after OTP verification
             self.selenium.handle_possible_alerts(timeout=15)
             
-            # Wait for page processing with dynamic check instead of fixed sleep
-            wait_time = 0
-            max_wait = 10
-            while wait_time < max_wait:
-                current_url = self.selenium.get_current_url()
-                if current_url and ("dashboard" in current_url or "user" in current_url):
-                    break
-                time.sleep(1)
-                wait_time += 1
+            # Poll for the post-login redirect instead of sleeping in 1s steps
+            self.selenium.wait_until(EC.url_matches(LOGGED_IN_URL_RE), timeout=10)
             
             # Check current URL for successful redirect
             current_url = self.selenium.get_current_url()
             logger.info(f"Current URL after OTP verification: {current_url}")
             
-            if current_url:
-                if "dashboard" in current_url or "user" in current_url:
-                    self.logged_in = True
-                    self.otp_required = False
-                    logger.info("Login successful - already on dashboard")
-                    return True, "Login successful"
-                elif "signin" in current_url:
-                    logger.info("Still on signin page - checking for additional steps")
+            page = classify_url(current_url)
+            if page in LOGGED_IN_PAGES:
+                self._on_logged_in()
+                logger.info("Login successful - already on dashboard")
+                return True, "Login successful"
+            elif page is PageKind.LOGIN:
+                logger.info("Still on signin page - checking for additional steps")
+                
+                # Look for Sign In button and click if present
+                signin_btn = self.selenium.wait_for_element_robust(*SIGNIN_BTN_LOC, timeout=15)
+                if signin_btn and signin_btn.is_displayed():
+                    logger.info("Clicking Sign In button after OTP verification")
+                    signin_btn.click()
                     
-                    # Look for Sign In button and click if present
-                    signin_btn = self.selenium.wait_for_element_robust(By.ID, "signInBtn", timeout=15)
-                    if signin_btn and signin_btn.is_displayed():
-                        logger.info("Clicking Sign In button after OTP verification")
-                        signin_btn.click()
-                        
-                        # Handle any alerts after signin button click
-                        self.selenium.handle_possible_alerts(timeout=10)
-                        
-                        # Wait for redirect
-                        time.sleep(5)
-                        
-                        current_url = self.selenium.get_current_url()
-                        if current_url and ("dashboard" in current_url or "user" in current_url):
-                            self.logged_in = True
-                            self.otp_required = False
-
-                            # 🔥 SAVE COOKIES HERE
-                            save_cookies(self.selenium.driver)
-                            logger.info("Cookies saved after OTP login")
-
-                            return True, "Login successful"
+                    # Handle any alerts after signin button click
+                    self.selenium.handle_possible_alerts(timeout=10)
+                    
+                    # Wait for redirect
+                    self.selenium.wait_until(EC.url_matches(LOGGED_IN_URL_RE), timeout=5)
+                    
+                    current_url = self.selenium.get_current_url()
+                    if classify_url(current_url) in LOGGED_IN_PAGES:
+                        self._on_logged_in()
+                        return True, "Login successful"
             
             # Check for success/error status messages
-            status_element = self.selenium.wait_for_element_robust(By.ID, "otpStatus", timeout=10)
+            status_element = self.selenium.wait_for_element_robust(*OTP_STATUS_LOC, timeout=10)
             if status_element:
                 status_text = status_element.text
                 logger.info(f"OTP Status: {status_text}")
                 
                 if "verified successfully" in status_text.lower():
-                    self.logged_in = True
-                    self.otp_required = False
-
-                    # 🔥 SAVE COOKIES HERE
-                    save_cookies(self.selenium.driver)
-                    logger.info("Cookies saved after OTP verified")
-
+                    self._on_logged_in()
                     return True, "OTP verified successfully"
                 elif "invalid" in status_text.lower() or "expired" in status_text.lower():
                     return False, f"OTP verification failed: {status_text}"
             
             # If we reach here, assume successful verification
-            self.logged_in = True
-            self.otp_required = False
-            save_cookies(self.selenium.driver)
-            logger.info("Cookies saved (assumed success)")
+            self._on_logged_in()
             logger.info("OTP verification completed (assumed successful)")
             
             return True, "OTP verification completed"
@@ -317,11 +410,7 @@ class SessionManager:
             logger.error(f"OTP verification failed: {e}")
             self.selenium.take_screenshot("otp_verification_error.png")
             return False, f"OTP verification error: {e}"
-          
-        except Exception as e:
-            logger.error(f"OTP verification error: {e}")
-            return False, f"OTP verification error: {str(e)}"
-        
+    
     def check_session_valid(self):
         """
         Check if current session is still valid
@@ -333,27 +422,28 @@ class SessionManager:
             if not self.selenium.driver:
                 return False
             
-            current_url = self.selenium.get_current_url()
-            print(f"Checking session validity, current URL: {current_url}")
-            self.selenium.driver.save_screenshot("current_url.png")
+            # Often read moments ago by start_session; reuse that read
+            current_url = self.selenium.get_current_url_cached()
+            logger.debug(f"Checking session validity, current URL: {current_url}")
+            self.selenium.debug_screenshot("current_url.png")
             # If we're on login page, session is not valid
-            if current_url and ("signin" in current_url or "login" in current_url or "data" in current_url):
+            if classify_url(current_url) in (PageKind.LOGIN, PageKind.BLANK):
                 return False
             
             # Try to navigate to dashboard
             self.selenium.navigate_to(self.dashboard_url)
-            time.sleep(2)
-            self.selenium.driver.save_screenshot("session_check.png")
+            self.selenium.wait_until(DASHBOARD_READY, timeout=3)
             
-            # Check if we're redirected to login
-            current_url = self.selenium.get_current_url()
-            if current_url and ("signin" in current_url or "login" in current_url):
+            # Check for session invalid alerts; the wait above already saw any alert
+            alert_text = self.selenium.handle_alert(accept=True, timeout=0)
+            if alert_text and "invalid session" in alert_text.lower():
                 self.logged_in = False
                 return False
+            self.selenium.debug_screenshot("session_check.png")
             
-            # Check for session invalid alerts
-            alert_text = self.selenium.handle_alert(accept=True)
-            if alert_text and "invalid session" in alert_text.lower():
+            # Check if we're redirected to login
+            current_url = self.selenium.get_current_url()
+            if classify_url(current_url) is PageKind.LOGIN:
                 self.logged_in = False
                 return False
             
@@ -385,16 +475,16 @@ class SessionManager:
             # Navigate to gatepass page to refresh tokens
             logger.info("Refreshing session by visiting gatepass page")
             self.selenium.navigate_to(self.gatepass_url)
-            time.sleep(3)
+            self.selenium.wait_until(GATEPASS_READY, timeout=3)
             
-            # Check for session invalid alerts
-            alert_text = self.selenium.handle_alert(accept=True)
+            # Check for session invalid alerts; the wait above already saw any alert
+            alert_text = self.selenium.handle_alert(accept=True, timeout=0)
             if alert_text and "invalid session" in alert_text.lower():
                 return False, "Session expired"
             
             # Check if we're on the right page
             current_url = self.selenium.get_current_url()
-            if current_url and "gatepass" in current_url:
+            if classify_url(current_url) is PageKind.GATEPASS:
                 return True, "Session refreshed successfully"
             
             return False, "Failed to refresh session"
@@ -416,13 +506,14 @@ class SessionManager:
                 return False
             
             logger.info("Navigating to gatepass page")
+            # Always reload so each attempt gets a fresh form and token
             success = self.selenium.navigate_to(self.gatepass_url)
             
             if success:
-                time.sleep(3)
+                self.selenium.wait_until(GATEPASS_READY, timeout=3)
                 
-                # Check for alerts (like "invalid session")
-                alert_text = self.selenium.handle_alert(accept=True)
+                # Check for alerts (like "invalid session"); the wait above already saw any alert
+                alert_text = self.selenium.handle_alert(accept=True, timeout=0)
                 if alert_text:
                     logger.warning(f"Alert detected: {alert_text}")
                     if "invalid session" in alert_text.lower():
@@ -431,7 +522,7 @@ class SessionManager:
                 
                 # Verify we're on the gatepass page
                 current_url = self.selenium.get_current_url()
-                if current_url and "gatepass" in current_url:
+                if classify_url(current_url) is PageKind.GATEPASS:
                     logger.info("Successfully navigated to gatepass page")
                     return True
                 else:
@@ -451,6 +542,7 @@ class SessionManager:
                 self.selenium.stop_driver()
                 logger.info("Browser session closed")
             self.logged_in = False
+            self.http_session = None
             self.otp_required = False
         except Exception as e:
             logger.error(f"Error closing session: {e}")
@@ -463,11 +555,17 @@ class SessionManager:
             str: CSRF token or None
         """
         try:
-            # Look for gatepass_token input field
-            token_element = self.selenium.find_element(By.NAME, "gatepass_token")
-            if token_element:
-                token_value = token_element.get_attribute("value")
+            # Cached per page load; the handler drops it whenever the browser navigates
+            token_value = self.selenium.page_values.get("csrf_token")
+            if token_value:
+                return token_value
+            
+            # Read the gatepass_token input's value in one script call
+            selector = '[name="gatepass_token"]'
+            token_value = self.selenium.batch_read([selector]).get(selector)
+            if token_value:
                 logger.info(f"Found CSRF token: {token_value[:20]}...")
+                self.selenium.page_values["csrf_token"] = token_value
                 return token_value
             
             logger.warning("CSRF token not found")
@@ -481,11 +579,11 @@ class SessionManager:
         """Logout from the system"""
         try:
             if self.selenium.driver:
-                logout_url = f"{self.base_url}/logout.php"
-                self.selenium.navigate_to(logout_url)
-                time.sleep(2)
+                self.selenium.navigate_to(self.logout_url)
+                self.selenium.wait_until(SIGNIN_READY, timeout=3)
             
             self.logged_in = False
+            self.http_session = None
             logger.info("Logged out successfully")
             
         except Exception as e:
@@ -6,21 +6,33 @@ Production settings for KPCL Automation Flask Application
 
 import multiprocessing
 import os
+import resource
 
 # Server socket
 bind = "0.0.0.0:5001"
 backlog = 2048
 
+# Allow long request lines (gunicorn's maximum)
+limit_request_line = 8190
+
+# Open-file limit for the server; each Chrome/chromedriver pair holds dozens
+# of descriptors on top of the client sockets
+NOFILE_LIMIT = 65536
+
 # Worker processes
+# One eventlet worker already serves requests concurrently as green threads,
+# so a long OTP flow does not block other requests. Socket.IO clients,
+# the browser pool and the submission scheduler live in process memory, so
+# extra workers would split dashboards and schedule duplicate submissions.
 workers = 1
-worker_class = "sync"
-worker_connections = 1000
+worker_class = "eventlet"
+worker_connections = 4096
 timeout = 30
 keepalive = 2
 
-# Restart workers after this many requests
-max_requests = 1000
-max_requests_jitter = 50
+# Never recycle the worker; a restart drops the logged-in browser and the
+# pending scheduled run
+max_requests = 0
 
 # Logging
 accesslog = "/root/kpcl-automation/logs/gunicorn_access.log"
@@ -59,6 +71,14 @@ raw_env = [
 ]
 
 def when_ready(server):
+    # Raise the soft limit as far as the hard limit allows; workers inherit it
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = NOFILE_LIMIT if hard == resource.RLIM_INFINITY else min(NOFILE_LIMIT, hard)
+    if soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError) as e:
+            server.log.warning("Could not raise open-file limit: %s", e)
     server.log.info("Server is ready. Spawning workers")
 
 def worker_int(worker):
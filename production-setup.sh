@@ -86,7 +86,7 @@ echo "🧪 Verifying Python dependencies..."
 python - <<EOF
 import selenium
 import flask
-import apscheduler
+import flask_socketio
 print("✅ Python dependencies OK")
 EOF
 
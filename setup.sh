@@ -42,7 +42,7 @@ fi
 
 # Test Python installation
 echo "🧪 Testing Python setup..."
-python -c "import selenium, flask, apscheduler; print('✅ All dependencies installed successfully')" 2>/dev/null || {
+python -c "import selenium, flask, flask_socketio; print('✅ All dependencies installed successfully')" 2>/dev/null || {
     echo "❌ Dependency installation failed. Please check errors above."
     exit 1
 }
@@ -5,6 +5,7 @@ class KPCLApp {
         this.socket = null;
         this.isConnected = false;
         this.currentStatus = 'idle';
+        this.state = {};
         this.logEntries = [];
         this.maxLogEntries = 100;
         
@@ -34,11 +35,16 @@ class KPCLApp {
         });
         
         this.socket.on('status_update', (data) => {
-            this.handleStatusUpdate(data);
+            // Payloads carry only changed keys under short names
+            const delta = this.expandStatus(data);
+            Object.assign(this.state, delta);
+            this.handleStatusUpdate(delta);
         });
         
         this.socket.on('form_status', (data) => {
-            this.handleFormStatus(data);
+            // Form status updates arrive batched as an array
+            const updates = Array.isArray(data) ? data : [data];
+            updates.forEach((update) => this.handleFormStatus(update));
         });
         
         this.socket.on('automation_started', (data) => {
@@ -78,11 +84,6 @@ class KPCLApp {
         this.socket.on('scheduler_status', (data) => {
             this.handleSchedulerStatus(data);
         });
-        
-        this.socket.on('submission_complete', (data) => {
-            const status = data.success ? 'success' : 'error';
-            this.showNotification(data.message, status);
-        });
     }
     
     bindEvents() {
@@ -388,13 +389,29 @@ class KPCLApp {
         document.getElementById('control-section').style.display = 'block';
     }
     
+    expandStatus(data) {
+        const keys = KPCLApp.STATUS_KEYS;
+        const expanded = {};
+        Object.keys(data).forEach((key) => {
+            expanded[keys[key] || key] = data[key];
+        });
+        return expanded;
+    }
+    
     handleStatusUpdate(data) {
-        this.currentStatus = data.status;
+        if (data.status !== undefined) {
+            this.currentStatus = data.status;
+        }
         this.updateUI();
         
         if (data.error_message) {
             this.addLogEntry(`Error: ${data.error_message}`, 'error');
         }
+        
+        if (data.completion) {
+            const status = data.completion.success ? 'success' : 'error';
+            this.showNotification(data.completion.message, status);
+        }
     }
     
     handleFormStatus(data) {
@@ -565,6 +582,20 @@ class KPCLApp {
     
 }
 
+// Wire names used by status_update, see _COMPACT_KEYS in app.py
+KPCLApp.STATUS_KEYS = {
+    s: 'status',
+    lr: 'last_run',
+    nr: 'next_run',
+    a: 'attempts',
+    ok: 'success',
+    e: 'error_message',
+    li: 'logged_in',
+    otp: 'otp_required',
+    v: 'version',
+    c: 'completion'
+};
+
 // Initialize application when DOM is loaded
 document.addEventListener('DOMContentLoaded', () => {
     window.kpclApp = new KPCLApp();